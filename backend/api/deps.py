@@ -2,15 +2,26 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import Optional, Callable
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Optional, Callable, Tuple
+from contextvars import ContextVar
+from functools import lru_cache
 
 from core.database import get_db
 from models.user import User
 from models.tenant import Tenant
 from services.supabase_auth import supabase_auth
+from services.token_cache import token_cache
+from services.user_cache import user_id_cache
+from services.trial_cache import trial_usage
 
 security = HTTPBearer()
 
+# Request-scoped memo of the authenticated user, keyed by token. Each request
+# runs in its own context, so this never leaks across requests.
+_request_user: ContextVar[Optional[Tuple[str, User]]] = ContextVar("_request_user", default=None)
+
 # Reusable exceptions
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,69 +50,127 @@ permission_denied_exception = HTTPException(
 )
 
 
+async def _provision_user(db: AsyncSession, email: str, supabase_user: dict) -> User:
+    """Create tenant and user for a first login, safe under concurrent requests.
+
+    The first user of an email domain gets a tenant owning that domain.
+    If another user's tenant already owns the domain, the new user gets a
+    tenant of their own without one; a domain never grants access to an
+    existing tenant. The user insert's ``ON CONFLICT (email)`` settles
+    concurrent first logins of the same user: the loser rolls back its
+    rows and loads the winner's.
+    """
+    domain = email.split("@")[1]
+    org_name = domain.split(".")[0]
+    tenant_stmt = (
+        pg_insert(Tenant)
+        .values(org_name=org_name, domain=domain, plan="trial")
+        .on_conflict_do_nothing(index_elements=["domain"])
+        .returning(Tenant.id)
+    )
+    tenant_id: Optional[int] = (await db.execute(tenant_stmt)).scalar_one_or_none()
+    if tenant_id is None:
+        tenant_id = (
+            await db.execute(
+                pg_insert(Tenant)
+                .values(org_name=org_name, domain=None, plan="trial")
+                .returning(Tenant.id)
+            )
+        ).scalar_one()
+
+    user_stmt = (
+        pg_insert(User)
+        .values(
+            email=email,
+            full_name=(supabase_user.get("user_metadata") or {}).get("full_name", ""),
+            tenant_id=tenant_id,
+            role="admin",
+            is_verified=supabase_user.get("email_confirmed", False),
+            auth_provider="supabase",
+            auth_provider_id=supabase_user.get("id"),
+            permissions=[]
+        )
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User.id)
+    )
+    if (await db.execute(user_stmt)).scalar_one_or_none() is None:
+        # Lost the race for this email: drop the tenant we just created
+        await db.rollback()
+    else:
+        await db.commit()
+
+    result = await db.execute(
+        select(User).options(joinedload(User.tenant)).where(User.email == email)
+    )
+    return result.scalar_one()
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
-    """Get current authenticated user using Supabase JWT token."""
+    """Get current authenticated user using Supabase JWT token.
+
+    Always depend on this with the default ``use_cache=True`` so FastAPI
+    resolves it once per request; the context-var memo covers re-entry.
+    """
     token = credentials.credentials if credentials else None
     if not token:
         raise credentials_exception
 
-    try:
-        supabase_user = await supabase_auth.verify_token(token)
-    except Exception:
-        raise credentials_exception
+    memo = _request_user.get()
+    if memo is not None and memo[0] == token:
+        return memo[1]
 
-    if not supabase_user:
-        raise credentials_exception
+    supabase_user = await token_cache.get(token)
+    if supabase_user is None:
+        try:
+            supabase_user = await supabase_auth.verify_token_local(token)
+        except Exception:
+            raise credentials_exception
+
+        if not supabase_user:
+            raise credentials_exception
+
+        await token_cache.set(token, supabase_user)
 
     email: Optional[str] = supabase_user.get("email") if isinstance(supabase_user, dict) else None
     if not email or "@" not in email:
         raise credentials_exception
 
-    # Fetch user
-    result = await db.execute(select(User).where(User.email == email))
-    user: Optional[User] = result.scalar_one_or_none()
+    # Fetch user: primary-key lookup when the id is cached, else by email
+    user: Optional[User] = None
+    user_id = await user_id_cache.get(email)
+    if user_id is not None:
+        user = await db.get(User, user_id, options=[joinedload(User.tenant)])
+        if user is not None and user.email != email:
+            user = None
 
-    # Auto-provision user & tenant on first login
     if user is None:
-        domain = email.split("@")[1]
-        tenant = Tenant(
-            org_name=domain.split(".")[0],
-            domain=domain,
-            plan="trial"
+        result = await db.execute(
+            select(User).options(joinedload(User.tenant)).where(User.email == email)
         )
-        db.add(tenant)
-        await db.flush()  # assign tenant.id
+        user = result.scalar_one_or_none()
+        if user is not None:
+            await user_id_cache.set(email, user.id)
 
-        user = User(
-            email=email,
-            full_name=supabase_user.get("user_metadata", {}).get("full_name", "") if isinstance(supabase_user, dict) else "",
-            tenant_id=tenant.id,
-            role="admin",
-            is_verified=supabase_user.get("email_confirmed", False) if isinstance(supabase_user, dict) else False,
-            auth_provider="supabase",
-            auth_provider_id=supabase_user.get("id") if isinstance(supabase_user, dict) else None,
-            permissions=[]
-        )
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
+    # Auto-provision user & tenant on first login
+    if user is None:
+        user = await _provision_user(db, email, supabase_user)
+        await user_id_cache.set(email, user.id)
 
     if not user.is_active:
         raise inactive_user_exception
 
+    _request_user.set((token, user))
     return user
 
 
 async def get_current_tenant(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ) -> Tenant:
-    """Resolve tenant for current user."""
-    result = await db.execute(select(Tenant).where(Tenant.id == current_user.tenant_id))
-    tenant: Optional[Tenant] = result.scalar_one_or_none()
+    """Resolve tenant for current user (eager-loaded with the user)."""
+    tenant: Optional[Tenant] = current_user.tenant
 
     if tenant is None:
         raise missing_tenant_exception
@@ -112,8 +181,12 @@ async def get_current_tenant(
     return tenant
 
 
+@lru_cache(maxsize=64)
 def require_permission(permission: str) -> Callable:
-    """Factory that returns dependency enforcing a permission (admin bypass)."""
+    """Factory that returns dependency enforcing a permission (admin bypass).
+
+    Memoized so every route guarding the same permission shares one callable.
+    """
     async def permission_dependency(current_user: User = Depends(get_current_user)):
         if not current_user.has_permission(permission):
             raise permission_denied_exception
@@ -127,6 +200,6 @@ def require_admin() -> Callable:
 
 async def require_trial_quota(current_tenant: Tenant = Depends(get_current_tenant)) -> Tenant:
     """Enforce active trial quota for trial tenants."""
-    if current_tenant.plan == "trial" and not current_tenant.is_trial_active:
+    if current_tenant.plan == "trial" and not await trial_usage.is_active(current_tenant):
         raise trial_quota_exceeded_exception
     return current_tenant
\ No newline at end of file
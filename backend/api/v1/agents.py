@@ -1,28 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, exists, update, text
 from typing import List, Optional
-from datetime import datetime
+from functools import lru_cache
+import asyncio
+import logging
+
+import orjson
+
+try:  # Optional accurate token counting
+    import tiktoken  # type: ignore
+except ImportError:  # pragma: no cover - fall back to byte heuristic
+    tiktoken = None  # type: ignore
 
 from core.database import get_db
 from api.deps import get_current_user, get_current_tenant
 from models.user import User
 from models.tenant import Tenant
 from models.agent import AgentType, AgentInstance
-from models.interaction import Interaction
-from services.agent_orchestrator import AgentFactory
+from services.agent_orchestrator import AgentFactory, AgentState
+from services.catalog_cache import catalog_cache
+from services.trial_cache import trial_usage
+from services.interaction_writer import interaction_writer
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def _get_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        # May download the BPE file on first use
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+        return None
+
+
+async def preload_token_encoding() -> None:
+    """Load the tokenizer off the event loop (call at startup)."""
+    await asyncio.to_thread(_get_encoding)
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or ~4 bytes per token if unavailable."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text.encode()) // 4
+    return len(encoding.encode(text))
+
+# Interaction ids are reserved before the batched insert that uses them
+_NEXT_INTERACTION_ID = text("SELECT nextval(pg_get_serial_sequence('interactions', 'id'))")
+
+# Columns exposed by the public catalog (selected directly, no ORM hydration)
+CATALOG_COLUMNS = (
+    AgentType.id,
+    AgentType.name,
+    AgentType.display_name,
+    AgentType.description,
+    AgentType.category,
+    AgentType.base_price_monthly,
+    AgentType.price_per_query,
+    AgentType.trial_enabled,
+    AgentType.supports_file_upload,
+    AgentType.supports_integrations,
+    AgentType.is_featured,
+)
+
+
 @router.get("/catalog")
 async def get_agent_catalog(
     category: Optional[str] = Query(None),
     featured_only: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get available agent types in the catalog."""
-    query = select(AgentType).where(AgentType.is_active == True)
+    """Get available agent types in the catalog (cached in Redis)."""
+    cached = await catalog_cache.get(category, featured_only)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    query = select(*CATALOG_COLUMNS).where(AgentType.is_active == True)
     
     if category:
         query = query.where(AgentType.category == category)
@@ -31,24 +92,9 @@ async def get_agent_catalog(
         query = query.where(AgentType.is_featured == True)
     
     result = await db.execute(query)
-    agent_types = result.scalars().all()
+    body = await catalog_cache.set(category, featured_only, [dict(row._mapping) for row in result])
     
-    return [
-        {
-            "id": agent.id,
-            "name": agent.name,
-            "display_name": agent.display_name,
-            "description": agent.description,
-            "category": agent.category,
-            "base_price_monthly": agent.base_price_monthly,
-            "price_per_query": agent.price_per_query,
-            "trial_enabled": agent.trial_enabled,
-            "supports_file_upload": agent.supports_file_upload,
-            "supports_integrations": agent.supports_integrations,
-            "is_featured": agent.is_featured
-        }
-        for agent in agent_types
-    ]
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/trial")
@@ -60,36 +106,38 @@ async def start_trial(
 ):
     """Start a trial for an agent type."""
     # Check if tenant can start trials
-    if not current_tenant.is_trial_active:
+    if not await trial_usage.is_active(current_tenant):
         raise HTTPException(
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
             detail="Trial period has expired. Please upgrade your plan."
         )
     
-    # Get agent type
-    result = await db.execute(select(AgentType).where(AgentType.id == agent_type_id))
-    agent_type = result.scalar_one_or_none()
+    # Get agent type and whether a trial is already running in one round-trip
+    has_active = exists().where(
+        AgentInstance.tenant_id == current_tenant.id,
+        AgentInstance.agent_type_id == agent_type_id,
+        AgentInstance.status.in_(["provisioning", "active"])
+    ).label("has_active")
+    result = await db.execute(
+        select(AgentType, has_active).where(AgentType.id == agent_type_id)
+    )
+    row = result.one_or_none()
     
-    if not agent_type:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent type not found"
         )
     
+    agent_type, trial_exists = row
+    
     if not agent_type.trial_enabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Trial not available for this agent type"
         )
     
-    # Check if trial already exists
-    existing_query = select(AgentInstance).where(
-        AgentInstance.tenant_id == current_tenant.id,
-        AgentInstance.agent_type_id == agent_type_id,
-        AgentInstance.status.in_(["provisioning", "active"])
-    )
-    result = await db.execute(existing_query)
-    if result.scalar_one_or_none():
+    if trial_exists:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Trial already active for this agent type"
@@ -130,27 +178,32 @@ async def get_agent_instances(
     current_tenant: Tenant = Depends(get_current_tenant),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get tenant's agent instances."""
-    query = select(AgentInstance).where(
-        AgentInstance.tenant_id == current_tenant.id,
-        AgentInstance.status != "deleted"
+    """Get tenant's agent instances with their agent type names inline."""
+    query = (
+        select(AgentInstance, AgentType.name, AgentType.display_name)
+        .join(AgentType, AgentInstance.agent_type_id == AgentType.id)
+        .where(
+            AgentInstance.tenant_id == current_tenant.id,
+            AgentInstance.status != "deleted"
+        )
     )
     
     result = await db.execute(query)
-    instances = result.scalars().all()
     
     return [
         {
             "id": instance.id,
             "name": instance.name,
             "agent_type_id": instance.agent_type_id,
+            "agent_type_name": agent_type_name,
+            "agent_type_display_name": agent_type_display_name,
             "status": instance.status,
             "queries_count": instance.queries_count,
             "tokens_used": instance.tokens_used,
             "last_used": instance.last_used,
             "provisioned_at": instance.provisioned_at
         }
-        for instance in instances
+        for instance, agent_type_name, agent_type_display_name in result
     ]
 
 
@@ -158,6 +211,7 @@ async def get_agent_instances(
 async def query_agent(
     instance_id: int,
     prompt: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     current_tenant: Tenant = Depends(get_current_tenant),
     db: AsyncSession = Depends(get_db)
@@ -180,13 +234,19 @@ async def query_agent(
     
     # Check trial quota
     if current_tenant.plan == "trial":
-        if not current_tenant.is_trial_active:
+        if not await trial_usage.is_active(current_tenant):
             raise HTTPException(
                 status_code=status.HTTP_402_PAYMENT_REQUIRED,
                 detail="Trial quota exceeded. Please upgrade your plan."
             )
     
-    # TODO: Execute agent query using LangGraph orchestrator
+    # Captured up front: the session is committed before streaming starts,
+    # and a rollback below would expire the ORM instances
+    tenant_id = current_tenant.id
+    user_id = current_user.id
+    is_trial = current_tenant.plan == "trial"
+    model = instance.model
+    
     try:
         # Create agent orchestrator
         agent_config = instance.config.copy()
@@ -197,67 +257,129 @@ async def query_agent(
             config=agent_config
         )
         
-        # Execute query
-        start_time = datetime.utcnow()
-        result = await agent.execute(prompt)
-        
-        # Save interaction
-        interaction = Interaction(
-            prompt=prompt,
-            response=result["response"],
-            model=result["metadata"].get("model", instance.model),
-            tokens_input=len(prompt.split()),  # Rough estimate
-            tokens_output=len(result["response"].split()),  # Rough estimate
-            tokens_total=len(prompt.split()) + len(result["response"].split()),
-            response_time_ms=result["execution_time_ms"],
-            context_chunks=result.get("context_used", 0),
-            status="completed" if result["success"] else "failed",
-            error_message=result.get("error"),
-            tenant_id=current_tenant.id,
-            user_id=current_user.id,
-            agent_instance_id=instance.id
-        )
-        
-        db.add(interaction)
-        
-        # Update usage counters
-        instance.queries_count += 1
-        instance.tokens_used += interaction.tokens_total
-        instance.last_used = datetime.utcnow()
-        
-        if current_tenant.plan == "trial":
-            current_tenant.trial_queries_used += 1
-        
-        await db.commit()
-        
-        return {
-            "response": result["response"],
-            "model": interaction.model,
-            "tokens_used": interaction.tokens_total,
-            "response_time_ms": interaction.response_time_ms,
-            "context_chunks": interaction.context_chunks,
-            "interaction_id": interaction.id
-        }
-        
     except Exception as e:
-        # Log error and return generic response
-        import logging
-        logger = logging.getLogger(__name__)
+        # Log error and report it on the stream like generation failures
         logger.error(f"Error executing agent query: {e}")
         
         response = f"I apologize, but I encountered an error processing your request: {str(e)}"
-    
-        
-        # Update usage counters (even for errors)
-        instance.queries_count += 1
-        current_tenant.trial_queries_used += 1
         
+        # Discard any half-built unit of work, then record the failed query
+        # with SQL-side increments (rolled-back instances are expired).
+        await db.rollback()
+        await db.execute(
+            update(AgentInstance)
+            .where(AgentInstance.id == instance_id)
+            .values(queries_count=AgentInstance.queries_count + 1)
+        )
+        if is_trial and not await trial_usage.record_query(tenant_id):
+            await db.execute(
+                update(Tenant)
+                .where(Tenant.id == tenant_id)
+                .values(trial_queries_used=Tenant.trial_queries_used + 1)
+            )
         await db.commit()
         
-        return {
-            "response": response,
-            "model": instance.model,
-            "tokens_used": 0,
-            "response_time_ms": 0,
-            "error": True
-        }
+        async def error_stream():
+            yield _sse_event({
+                "done": True,
+                "model": model,
+                "tokens_used": 0,
+                "response_time_ms": 0,
+                "context_chunks": 0,
+                "error": response
+            })
+        
+        return StreamingResponse(error_stream(), media_type="text/event-stream")
+    
+    # The row is written later in a batch; reserve its id now so the client
+    # can reference the interaction (e.g. for feedback) once the stream ends
+    interaction_id = (await db.execute(_NEXT_INTERACTION_ID)).scalar_one()
+    
+    # End the read transaction so the pooled connection goes back to the pool
+    # now; get_db's teardown only runs after the stream and background tasks.
+    await db.commit()
+    
+    state = agent.new_state(prompt)
+    # Text sent so far; persisted even if the client disconnects mid-stream
+    answer: List[str] = []
+    
+    async def event_stream():
+        try:
+            async for text in agent.astream(state):
+                answer.append(text)
+                yield _sse_event({"delta": text})
+        except Exception as e:
+            logger.error(f"Error executing agent query: {e}")
+            state.error = str(e)
+        
+        _count_usage(state, answer)
+        yield _sse_event({
+            "done": True,
+            "interaction_id": interaction_id,
+            "model": state.metadata.get("model", model),
+            "tokens_used": state.metadata["tokens_input"] + state.metadata["tokens_output"],
+            "response_time_ms": state.metadata.get("execution_time_ms", 0),
+            "context_chunks": len(state.context),
+            "error": state.error
+        })
+    
+    # Bookkeeping runs after the last byte is sent (or the client goes away),
+    # off the user-facing path
+    background_tasks.add_task(
+        _persist_interaction, state, answer, interaction_id, model, tenant_id, user_id, instance_id, is_trial
+    )
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _sse_event(payload: dict) -> bytes:
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _count_usage(state: AgentState, answer: List[str]) -> None:
+    """Record token counts on ``state`` once, from whatever was generated."""
+    if "tokens_output" in state.metadata:
+        return
+    if not state.response:
+        state.response = "".join(answer)
+    state.metadata["tokens_input"] = count_tokens(state.query)
+    state.metadata["tokens_output"] = count_tokens(state.response)
+
+
+async def _persist_interaction(
+    state: AgentState,
+    answer: List[str],
+    interaction_id: int,
+    model: Optional[str],
+    tenant_id: int,
+    user_id: int,
+    instance_id: int,
+    is_trial: bool
+) -> None:
+    """Queue a finished interaction and its usage counters for a batched write.
+    
+    Usage is counted here too, so a stream cut off by a client disconnect is
+    still billed for the text generated before it stopped.
+    """
+    _count_usage(state, answer)
+    tokens_input = state.metadata["tokens_input"]
+    tokens_output = state.metadata["tokens_output"]
+    row = {
+        "id": interaction_id,
+        "prompt": state.query,
+        "response": state.response,
+        "model": state.metadata.get("model", model),
+        "tokens_input": tokens_input,
+        "tokens_output": tokens_output,
+        "tokens_total": tokens_input + tokens_output,
+        "response_time_ms": state.metadata.get("execution_time_ms", 0),
+        "context_chunks": len(state.context),
+        "status": "completed" if state.error is None else "failed",
+        "error_message": state.error,
+        "tenant_id": tenant_id,
+        "user_id": user_id,
+        "agent_instance_id": instance_id
+    }
+    
+    # Trial usage goes through Redis; only fall back to Postgres without it
+    trial_fallback = is_trial and not await trial_usage.record_query(tenant_id)
+    await interaction_writer.add(row, trial_tenant_id=tenant_id if trial_fallback else None)
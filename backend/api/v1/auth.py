@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import datetime, timedelta
+from sqlalchemy import select, update, func
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -11,6 +11,7 @@ from core.config import settings
 from models.user import User
 from models.tenant import Tenant
 from services.supabase_auth import supabase_auth
+from services.token_cache import token_cache
 
 router = APIRouter()
 
@@ -67,7 +68,7 @@ async def signup(
             org_name=request.org_name,
             domain=request.email.split("@")[1],
             plan="trial",
-            trial_end_date=datetime.utcnow() + timedelta(days=settings.DEFAULT_TRIAL_DAYS)
+            trial_end_date=datetime.now(timezone.utc) + timedelta(days=settings.DEFAULT_TRIAL_DAYS)
         )
         db.add(tenant)
         await db.flush()
@@ -124,13 +125,11 @@ async def login(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Update last login in our database
-        result = await db.execute(select(User).where(User.email == request.email))
-        user = result.scalar_one_or_none()
-        
-        if user:
-            user.last_login = datetime.utcnow()
-            await db.commit()
+        # Update last login in our database (single UPDATE, no read-modify-write)
+        await db.execute(
+            update(User).where(User.email == request.email).values(last_login=func.now())
+        )
+        await db.commit()
         
         return {
             "access_token": supabase_result["access_token"],
@@ -183,6 +182,7 @@ async def logout(
 ):
     """Logout user."""
     try:
+        await token_cache.invalidate(access_token)
         success = await supabase_auth.sign_out(access_token)
         
         if success:
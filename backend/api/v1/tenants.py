@@ -54,6 +54,10 @@ async def get_usage_stats(
             "storage_mb_used": current_tenant.trial_upload_mb_used,
             "storage_mb_limit": current_tenant.trial_upload_mb_limit
         },
+        "last_30_days": {
+            "queries": current_tenant.interactions_count_30d,
+            "tokens": current_tenant.tokens_total_30d
+        },
         "total": {
             "agents_created": 0,  # TODO: Count from DB
             "documents_uploaded": 0,  # TODO: Count from DB
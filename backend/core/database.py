@@ -1,10 +1,18 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    AsyncSession,
+    async_sessionmaker,
+    async_scoped_session,
+)
+from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import MetaData
+import asyncio
 import logging
-from typing import Optional
+from typing import Any, Optional
+
+import orjson
 
-from .config import settings
+from .config import settings, IS_DEV
 
 # Database metadata
 metadata = MetaData(
@@ -18,26 +26,50 @@ metadata = MetaData(
 )
 
 # SQLAlchemy base
-Base = declarative_base(metadata=metadata)
+class Base(DeclarativeBase):
+    metadata = metadata
+
+def _json_serializer(value: Any) -> str:
+    # asyncpg binds JSON/JSONB parameters as text
+    return orjson.dumps(value).decode()
+
 
 engine = None  # type: ignore
 AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+# Task-scoped registry: every dependency resolved within one request task
+# shares a single session, released back to the pool via remove().
+ScopedSession: Optional[async_scoped_session[AsyncSession]] = None
+
+
+def build_engine(echo: bool = IS_DEV):
+    """Create the pooled async engine with the app's sizing and driver settings."""
+    return create_async_engine(
+        settings.database_url,
+        echo=echo,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
+        connect_args={
+            "server_settings": {"jit": "off"},
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        },
+    )
 
 
 async def init_db():
     """Initialize database."""
     try:
-        global engine, AsyncSessionLocal
+        global engine, AsyncSessionLocal, ScopedSession
 
         if engine is None:
-            db_url = settings.database_url
-            engine = create_async_engine(
-                db_url,
-                echo=settings.ENVIRONMENT == "development",
-                future=True,
-                pool_pre_ping=True,
-                pool_recycle=300,
-            )
+            engine = build_engine()
             AsyncSessionLocal = async_sessionmaker(
                 engine,
                 class_=AsyncSession,
@@ -45,11 +77,12 @@ async def init_db():
                 autoflush=False,
                 autocommit=False,
             )
+            ScopedSession = async_scoped_session(AsyncSessionLocal, scopefunc=asyncio.current_task)
 
             # Import models lazily to avoid circular imports (models import Base from this module)
             import models  # noqa: F401
 
-            if settings.ENVIRONMENT == "development":
+            if IS_DEV:
                 async with engine.begin() as conn:
                     await conn.run_sync(Base.metadata.create_all)
         
@@ -60,17 +93,14 @@ async def init_db():
 
 
 async def get_db() -> AsyncSession:
-    """Get database session."""
-    if AsyncSessionLocal is None:
+    """Get the database session scoped to the current task."""
+    if ScopedSession is None:
         raise RuntimeError("Database not initialized. Call init_db() during startup before using get_db().")
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
+    try:
+        yield ScopedSession()
+    finally:
+        # remove() closes the session, which also rolls back any open transaction
+        await ScopedSession.remove()
 
 
 def get_engine():
@@ -1,10 +1,21 @@
 import logging
 import sys
 from typing import Any, Dict
-import json
-from datetime import datetime
+from datetime import datetime, timezone
 
-from .config import settings
+import orjson
+
+from .config import IS_PROD, LOG_LEVEL_INT
+
+
+# Neither formatter emits thread/process fields, so skip collecting them
+# when each LogRecord is built.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# Optional context attributes copied from log records when present
+_EXTRA_KEYS = ("tenant_id", "user_id", "agent_id", "request_id")
 
 
 class StructuredFormatter(logging.Formatter):
@@ -12,7 +23,7 @@ class StructuredFormatter(logging.Formatter):
     
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -22,27 +33,35 @@ class StructuredFormatter(logging.Formatter):
         }
         
         # Add extra fields
-        if hasattr(record, "tenant_id"):
-            log_data["tenant_id"] = record.tenant_id
-        if hasattr(record, "user_id"):
-            log_data["user_id"] = record.user_id
-        if hasattr(record, "agent_id"):
-            log_data["agent_id"] = record.agent_id
-        if hasattr(record, "request_id"):
-            log_data["request_id"] = record.request_id
+        attrs = record.__dict__
+        log_data.update({key: attrs[key] for key in _EXTRA_KEYS if key in attrs})
             
         # Add exception info
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
             
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
+
+
+# Formatter chosen once: structured JSON in production, plain text elsewhere
+FORMATTER: logging.Formatter = (
+    StructuredFormatter()
+    if IS_PROD
+    else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+)
+
+_LOGGING_CONFIGURED = False
 
 
 def setup_logging():
-    """Set up application logging."""
+    """Set up application logging (idempotent)."""
+    global _LOGGING_CONFIGURED
+    if _LOGGING_CONFIGURED:
+        return
+    
     # Root logger
     root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, settings.LOG_LEVEL))
+    root_logger.setLevel(LOG_LEVEL_INT)
     
     # Remove existing handlers
     for handler in root_logger.handlers[:]:
@@ -50,24 +69,18 @@ def setup_logging():
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, settings.LOG_LEVEL))
-    
-    if settings.ENVIRONMENT == "production":
-        # Use structured logging in production
-        formatter = StructuredFormatter()
-    else:
-        # Use simple format in development
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-    
-    console_handler.setFormatter(formatter)
+    # Drops records below the configured level before they are formatted,
+    # even when a child logger is set more verbosely
+    console_handler.setLevel(LOG_LEVEL_INT)
+    console_handler.setFormatter(FORMATTER)
     root_logger.addHandler(console_handler)
     
     # Third-party loggers
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    _LOGGING_CONFIGURED = True
 
 
 def get_logger(name: str) -> logging.Logger:
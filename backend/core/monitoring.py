@@ -1,30 +1,115 @@
-from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry
+from prometheus_client import (
+    Counter,
+    Histogram,
+    Gauge,
+    CollectorRegistry,
+    GCCollector,
+    PlatformCollector,
+    ProcessCollector,
+    start_http_server,
+)
+from functools import lru_cache
+import importlib.util
 import logging
+import time
 
-try:  # Optional OpenTelemetry imports
-    from opentelemetry import trace  # type: ignore
-    from opentelemetry.sdk.trace import TracerProvider  # type: ignore
-    OTEL_AVAILABLE = True
-except ImportError:  # pragma: no cover - best effort fallback
-    trace = None  # type: ignore
-    TracerProvider = None  # type: ignore
-    OTEL_AVAILABLE = False
+from .config import settings, IS_PROD
 
-from .config import settings
+# Single registry for all app metrics, served by the Prometheus HTTP server
+REGISTRY = CollectorRegistry()
+
+# A custom registry starts empty; add the process/GC/platform collectors the
+# default registry would have had
+ProcessCollector(registry=REGISTRY)
+GCCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
 
 # Prometheus metrics
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
-REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request duration')
-AGENT_QUERIES = Counter('agent_queries_total', 'Total agent queries', ['tenant_id', 'agent_type'])
-ACTIVE_AGENTS = Gauge('active_agents', 'Number of active agent instances')
-TRIAL_CONVERSIONS = Counter('trial_conversions_total', 'Trial to paid conversions')
+REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'], registry=REGISTRY)
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request duration', registry=REGISTRY)
+AGENT_QUERIES = Counter('agent_queries_total', 'Total agent queries', ['tenant_id', 'agent_type'], registry=REGISTRY)
+ACTIVE_AGENTS = Gauge('active_agents', 'Number of active agent instances', registry=REGISTRY)
+TRIAL_CONVERSIONS = Counter('trial_conversions_total', 'Trial to paid conversions', registry=REGISTRY)
+
+# Bound once so request middleware skips the attribute lookup per request
+observe_request = REQUEST_DURATION.observe
+
+
+@lru_cache(maxsize=4096)
+def request_counter(method: str, endpoint: str, status: str):
+    """Return the REQUEST_COUNT child for a label set, memoized.
+
+    Use from request middleware as
+    ``request_counter(method, route_path, str(status_code)).inc()`` so
+    prometheus_client's label hashing runs once per distinct label set. Pass
+    the route template, not the raw URL, to keep cardinality bounded.
+    """
+    return REQUEST_COUNT.labels(method, endpoint, status)
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding REQUEST_COUNT and REQUEST_DURATION.
+
+    Pure ASGI rather than ``BaseHTTPMiddleware`` so streaming responses pass
+    straight through. Requests are labelled with the matched route template
+    (``unmatched`` otherwise) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            observe_request(time.perf_counter() - start)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            request_counter(scope["method"], endpoint, str(status_code)).inc()
+
+
+def otel_available() -> bool:
+    """Check for the optional OpenTelemetry SDK without importing it."""
+    try:
+        return importlib.util.find_spec("opentelemetry.sdk") is not None
+    except ModuleNotFoundError:  # parent package missing
+        return False
+
 
 def setup_monitoring():
-    """Set up monitoring and tracing (graceful if optional deps missing)."""
-    if settings.ENVIRONMENT == "production" and OTEL_AVAILABLE:
-        trace.set_tracer_provider(TracerProvider())  # type: ignore
+    """Set up monitoring and tracing (graceful if optional deps missing).
+
+    OpenTelemetry is imported only here, and only in production, so dev and
+    test processes never pay for loading it.
+    """
+    if IS_PROD and otel_available():
+        from opentelemetry import trace  # type: ignore
+        from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+
+        trace.set_tracer_provider(TracerProvider())
         logging.info("OpenTelemetry tracing initialized")
-    elif settings.ENVIRONMENT == "production" and not OTEL_AVAILABLE:
+    elif IS_PROD:
         logging.warning("OpenTelemetry not installed; skipping tracing. Install opentelemetry-sdk to enable.")
     else:
         logging.info("Monitoring setup skipped in development")
+
+
+def start_metrics_server() -> bool:
+    """Serve REGISTRY over HTTP unless disabled (port 0) or in test/cli runs."""
+    if settings.PROMETHEUS_PORT <= 0 or settings.ENVIRONMENT in ("test", "cli"):
+        return False
+    start_http_server(settings.PROMETHEUS_PORT, registry=REGISTRY)
+    return True
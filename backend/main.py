@@ -1,18 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import logging
-from prometheus_client import start_http_server
 
-from core.config import settings
+import orjson
+
+from core.config import settings, IS_PROD, IS_DEV
 from core.database import init_db
 from core.logging import setup_logging
-from core.monitoring import setup_monitoring
+from core.monitoring import MetricsMiddleware, setup_monitoring, start_metrics_server
 from api.v1.api import api_router
 from api.deps import get_current_user
+from api.v1.agents import preload_token_encoding
+from services.supabase_auth import get_supabase_auth, close_http_client
+from services.user_cache import user_id_cache
+from services.catalog_cache import catalog_cache
+from services.query_cache import query_cache
+from services.trial_cache import trial_usage
+from services.interaction_writer import interaction_writer
+from services.embedding_cache import embedding_cache
+from services.vector_store import close_qdrant_client, close_embeddings
 
 
 @asynccontextmanager
@@ -23,14 +34,44 @@ async def lifespan(app: FastAPI):
     setup_monitoring()
     await init_db()
     
+    # Warm the Supabase JWKS so the first request verifies locally
+    try:
+        await get_supabase_auth().refresh_jwks()
+    except Exception as e:
+        logging.warning(f"Could not preload Supabase JWKS: {e}")
+    
+    # Load the tokenizer now rather than on the first streamed query
+    await preload_token_encoding()
+    
     # Start Prometheus metrics server
-    if settings.ENVIRONMENT != "test":
-        start_http_server(settings.PROMETHEUS_PORT)
+    start_metrics_server()
+    
+    # Batch trial query counters from Redis into Postgres
+    trial_flusher = asyncio.create_task(trial_usage.run(settings.TRIAL_USAGE_FLUSH_SECONDS))
+    
+    # Batch interaction inserts off the request path
+    interaction_flusher = asyncio.create_task(interaction_writer.run())
     
     logging.info("AeonAgent backend started successfully")
     yield
     
     # Shutdown
+    interaction_flusher.cancel()
+    try:
+        await interaction_flusher
+    except asyncio.CancelledError:
+        pass
+    await interaction_writer.flush()
+    trial_flusher.cancel()
+    await trial_usage.flush()
+    await trial_usage.close()
+    await close_http_client()
+    await user_id_cache.close()
+    await catalog_cache.close()
+    await query_cache.close()
+    await embedding_cache.close()
+    await close_embeddings()
+    await close_qdrant_client()
     logging.info("AeonAgent backend shutting down")
 
 
@@ -39,46 +80,60 @@ app = FastAPI(
     title="AeonAgent API",
     description="SaaS platform for pre-built AI agent applications",
     version="1.0.0",
-    docs_url="/docs" if settings.ENVIRONMENT != "production" else None,
-    redoc_url="/redoc" if settings.ENVIRONMENT != "production" else None,
+    docs_url="/docs" if not IS_PROD else None,
+    redoc_url="/redoc" if not IS_PROD else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
-# Security
-security = HTTPBearer()
-
 # Middleware
+ALLOWED_HOSTS = frozenset(settings.ALLOWED_HOSTS)
+ALLOW_ANY_HOST = "*" in ALLOWED_HOSTS
+
+# Browsers reject a wildcard origin on credentialed requests, so credentials
+# are only advertised when origins are listed explicitly. Bearer-token calls
+# do not need them.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.ALLOWED_HOSTS,
-    allow_credentials=True,
+    allow_origins=["*"] if ALLOW_ANY_HOST else sorted(ALLOWED_HOSTS),
+    allow_credentials=not ALLOW_ANY_HOST,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=settings.ALLOWED_HOSTS
-)
+# A wildcard host list makes TrustedHostMiddleware a per-request no-op
+if not ALLOW_ANY_HOST:
+    app.add_middleware(
+        TrustedHostMiddleware,
+        allowed_hosts=sorted(ALLOWED_HOSTS)
+    )
+
+# Added last so it is outermost and times the whole middleware stack
+app.add_middleware(MetricsMiddleware)
 
 # Routes
 app.include_router(api_router, prefix="/api/v1")
 
 
+# Static payloads are encoded once instead of on every probe
+_ROOT_BYTES = orjson.dumps({
+    "message": "AeonAgent API",
+    "version": "1.0.0",
+    "status": "operational"
+})
+_HEALTH_BYTES = orjson.dumps({"status": "healthy"})
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
-    return {
-        "message": "AeonAgent API",
-        "version": "1.0.0",
-        "status": "operational"
-    }
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 
 @app.get("/protected")
@@ -92,6 +147,10 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True if settings.ENVIRONMENT == "development" else False,
+        loop="uvloop" if IS_PROD else "auto",
+        http="httptools" if IS_PROD else "auto",
+        access_log=not IS_PROD,
+        reload=IS_DEV,
+        workers=settings.UVICORN_WORKERS,
         log_level=settings.LOG_LEVEL.lower()
     )
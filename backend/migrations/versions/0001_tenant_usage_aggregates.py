@@ -0,0 +1,46 @@
+"""Tenant 30-day usage aggregates
+
+Adds the rolling aggregate columns to tenants for databases created before
+them, drops the per-row insert trigger that earlier dev schemas created
+(the interaction writer now bumps the counters once per tenant per batch)
+and backfills the columns from interactions.
+
+Revision ID: 0001_tenant_usage_aggregates
+Revises:
+Create Date: 2026-10-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_tenant_usage_aggregates"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE tenants ADD COLUMN IF NOT EXISTS interactions_count_30d integer NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE tenants ADD COLUMN IF NOT EXISTS tokens_total_30d integer NOT NULL DEFAULT 0")
+    op.execute("DROP TRIGGER IF EXISTS trg_interactions_tenant_aggregates ON interactions")
+    op.execute("DROP FUNCTION IF EXISTS bump_tenant_interaction_aggregates()")
+    op.execute("""
+        UPDATE tenants AS t
+        SET interactions_count_30d = a.queries,
+            tokens_total_30d = a.tokens
+        FROM (
+            SELECT tenant_id, count(*) AS queries, COALESCE(sum(tokens_total), 0) AS tokens
+            FROM interactions
+            WHERE timestamp > now() - interval '30 days'
+            GROUP BY tenant_id
+        ) AS a
+        WHERE t.id = a.tenant_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column("tenants", "tokens_total_30d")
+    op.drop_column("tenants", "interactions_count_30d")
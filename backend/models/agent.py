@@ -1,46 +1,52 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Computed, Index, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, func, true, false
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from core.database import Base
 
+if TYPE_CHECKING:
+    from .interaction import Interaction
+    from .tenant import Tenant
+
 
 class AgentType(Base):
     """Agent type definition (HR, Sales, Legal, etc.)."""
     
     __tablename__ = "agent_types"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), unique=True, nullable=False)
-    display_name = Column(String(255), nullable=False)
-    description = Column(Text)
-    category = Column(String(100))  # hr, sales, legal, marketing, etc.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    display_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    category: Mapped[Optional[str]] = mapped_column(String(100))  # hr, sales, legal, marketing, etc.
     
     # Configuration
-    config_template = Column(JSON, nullable=False)  # LangGraph configuration
-    default_model = Column(String(100), default="gemini-pro")
-    default_temperature = Column(Float, default=0.7)
+    config_template: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)  # LangGraph configuration
+    default_model: Mapped[Optional[str]] = mapped_column(String(100), default="gemini-pro")
+    default_temperature: Mapped[Optional[float]] = mapped_column(Float, default=0.7)
     
     # Pricing
-    trial_enabled = Column(Boolean, default=True)
-    base_price_monthly = Column(Float, default=99.0)
-    price_per_query = Column(Float, default=0.1)
+    trial_enabled: Mapped[Optional[bool]] = mapped_column(Boolean, server_default=true())
+    base_price_monthly: Mapped[Optional[float]] = mapped_column(Float, default=99.0)
+    price_per_query: Mapped[Optional[float]] = mapped_column(Float, default=0.1)
     
     # Features
-    supports_file_upload = Column(Boolean, default=True)
-    supports_integrations = Column(Boolean, default=True)
-    max_context_length = Column(Integer, default=16000)
+    supports_file_upload: Mapped[Optional[bool]] = mapped_column(Boolean, server_default=true())
+    supports_integrations: Mapped[Optional[bool]] = mapped_column(Boolean, server_default=true())
+    max_context_length: Mapped[Optional[int]] = mapped_column(Integer, default=16000)
     
     # Status
-    is_active = Column(Boolean, default=True)
-    is_featured = Column(Boolean, default=False)
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, server_default=true())
+    is_featured: Mapped[Optional[bool]] = mapped_column(Boolean, server_default=false())
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    instances = relationship("AgentInstance", back_populates="agent_type", cascade="all, delete-orphan")
+    instances: Mapped[List["AgentInstance"]] = relationship("AgentInstance", back_populates="agent_type", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<AgentType(id={self.id}, name='{self.name}', category='{self.category}')>"
@@ -50,43 +56,49 @@ class AgentInstance(Base):
     """Tenant-specific agent instance."""
     
     __tablename__ = "agent_instances"
+    __table_args__ = (
+        # Covers tenant_id lookups as well as the per-tenant status filters
+        Index("ix_agent_instances_tenant_status", "tenant_id", "status"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
     
     # Relationships
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
-    agent_type_id = Column(Integer, ForeignKey("agent_types.id"), nullable=False)
+    tenant_id: Mapped[int] = mapped_column(Integer, ForeignKey("tenants.id"), nullable=False)
+    agent_type_id: Mapped[int] = mapped_column(Integer, ForeignKey("agent_types.id"), nullable=False)
     
     # Configuration
-    config = Column(JSON, nullable=False)  # Instance-specific configuration
-    model = Column(String(100))
-    temperature = Column(Float)
-    system_prompt = Column(Text)
+    config: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)  # Instance-specific configuration
+    model: Mapped[Optional[str]] = mapped_column(String(100))
+    temperature: Mapped[Optional[float]] = mapped_column(Float)
+    system_prompt: Mapped[Optional[str]] = mapped_column(Text)
+    
+    # Qdrant collection for this instance, generated and stored by Postgres
+    qdrant_collection_name: Mapped[str] = mapped_column(
+        String(255),
+        Computed("'tenant_' || tenant_id::text || '_agent_' || id::text", persisted=True),
+        index=True,
+    )
     
     # Resources
-    status = Column(String(20), default="provisioning")  # provisioning, active, suspended, deleted
-    resource_quota = Column(JSON, default=dict)  # CPU, memory, storage limits
+    status: Mapped[Optional[str]] = mapped_column(String(20), default="provisioning")  # provisioning, active, suspended, deleted
+    resource_quota: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB, default=dict)  # CPU, memory, storage limits
     
     # Usage tracking
-    queries_count = Column(Integer, default=0)
-    tokens_used = Column(Integer, default=0)
-    last_used = Column(DateTime)
+    queries_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    tokens_used: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    last_used: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     
     # Timestamps
-    provisioned_at = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    provisioned_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    tenant = relationship("Tenant", back_populates="agent_instances")
-    agent_type = relationship("AgentType", back_populates="instances")
-    interactions = relationship("Interaction", back_populates="agent_instance", cascade="all, delete-orphan")
+    tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="agent_instances")
+    agent_type: Mapped["AgentType"] = relationship("AgentType", back_populates="instances")
+    interactions: Mapped[List["Interaction"]] = relationship("Interaction", back_populates="agent_instance", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<AgentInstance(id={self.id}, name='{self.name}', status='{self.status}')>"
-    
-    @property
-    def qdrant_collection_name(self) -> str:
-        """Get the Qdrant collection name for this agent instance."""
-        return f"tenant_{self.tenant_id}_agent_{self.id}"
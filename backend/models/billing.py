@@ -1,55 +1,59 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Integer, String, DateTime, Text, ForeignKey, JSON, Float, Boolean, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
 
 from core.database import Base
 
+if TYPE_CHECKING:
+    from .tenant import Tenant
+
 
 class Subscription(Base):
     """Tenant subscription information."""
     
     __tablename__ = "subscriptions"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Stripe information
-    stripe_subscription_id = Column(String(255), unique=True, index=True)
-    stripe_price_id = Column(String(255))
-    stripe_product_id = Column(String(255))
+    stripe_subscription_id: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True)
+    stripe_price_id: Mapped[Optional[str]] = mapped_column(String(255))
+    stripe_product_id: Mapped[Optional[str]] = mapped_column(String(255))
     
     # Subscription details
-    plan_name = Column(String(100), nullable=False)  # basic, pro, enterprise
-    status = Column(String(20), nullable=False)  # active, canceled, past_due, etc.
+    plan_name: Mapped[str] = mapped_column(String(100), nullable=False)  # basic, pro, enterprise
+    status: Mapped[str] = mapped_column(String(20), nullable=False)  # active, canceled, past_due, etc.
     
     # Billing
-    amount = Column(Float, nullable=False)  # Amount in cents
-    currency = Column(String(3), default="usd")
-    interval = Column(String(20), default="month")  # month, year
+    amount: Mapped[float] = mapped_column(Float, nullable=False)  # Amount in cents
+    currency: Mapped[Optional[str]] = mapped_column(String(3), default="usd")
+    interval: Mapped[Optional[str]] = mapped_column(String(20), default="month")  # month, year
     
     # Usage limits
-    query_limit = Column(Integer)  # Queries per billing period
-    user_limit = Column(Integer)   # Max users
-    storage_limit_gb = Column(Integer)  # Storage limit in GB
-    agent_limit = Column(Integer)  # Max agent instances
+    query_limit: Mapped[Optional[int]] = mapped_column(Integer)  # Queries per billing period
+    user_limit: Mapped[Optional[int]] = mapped_column(Integer)   # Max users
+    storage_limit_gb: Mapped[Optional[int]] = mapped_column(Integer)  # Storage limit in GB
+    agent_limit: Mapped[Optional[int]] = mapped_column(Integer)  # Max agent instances
     
     # Dates
-    current_period_start = Column(DateTime)
-    current_period_end = Column(DateTime)
-    trial_start = Column(DateTime)
-    trial_end = Column(DateTime)
-    canceled_at = Column(DateTime)
-    ended_at = Column(DateTime)
+    current_period_start: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    current_period_end: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    trial_start: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    trial_end: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    canceled_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     
     # Relationships
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    tenant_id: Mapped[int] = mapped_column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    tenant = relationship("Tenant", back_populates="subscriptions")
-    billing_records = relationship("BillingRecord", back_populates="subscription", cascade="all, delete-orphan")
+    tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="subscriptions")
+    billing_records: Mapped[List["BillingRecord"]] = relationship("BillingRecord", back_populates="subscription", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Subscription(id={self.id}, plan='{self.plan_name}', status='{self.status}')>"
@@ -65,36 +69,36 @@ class BillingRecord(Base):
     
     __tablename__ = "billing_records"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Stripe information
-    stripe_invoice_id = Column(String(255), unique=True, index=True)
-    stripe_charge_id = Column(String(255))
-    stripe_payment_intent_id = Column(String(255))
+    stripe_invoice_id: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True)
+    stripe_charge_id: Mapped[Optional[str]] = mapped_column(String(255))
+    stripe_payment_intent_id: Mapped[Optional[str]] = mapped_column(String(255))
     
     # Transaction details
-    amount = Column(Float, nullable=False)  # Amount in cents
-    currency = Column(String(3), default="usd")
-    status = Column(String(20), nullable=False)  # paid, pending, failed, refunded
-    description = Column(Text)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)  # Amount in cents
+    currency: Mapped[Optional[str]] = mapped_column(String(3), default="usd")
+    status: Mapped[str] = mapped_column(String(20), nullable=False)  # paid, pending, failed, refunded
+    description: Mapped[Optional[str]] = mapped_column(Text)
     
     # Usage details
-    period_start = Column(DateTime)
-    period_end = Column(DateTime)
-    queries_billed = Column(Integer, default=0)
-    overage_amount = Column(Float, default=0.0)
+    period_start: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    period_end: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    queries_billed: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    overage_amount: Mapped[Optional[float]] = mapped_column(Float, default=0.0)
     
     # Relationships
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
-    subscription_id = Column(Integer, ForeignKey("subscriptions.id"))
+    tenant_id: Mapped[int] = mapped_column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
+    subscription_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("subscriptions.id"), index=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    tenant = relationship("Tenant", back_populates="billing_records")
-    subscription = relationship("Subscription", back_populates="billing_records")
+    tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="billing_records")
+    subscription: Mapped[Optional["Subscription"]] = relationship("Subscription", back_populates="billing_records")
     
     def __repr__(self):
         return f"<BillingRecord(id={self.id}, amount={self.amount}, status='{self.status}')>"
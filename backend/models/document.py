@@ -1,46 +1,55 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, Integer, String, DateTime, Text, ForeignKey, Float, LargeBinary, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
+from core.config import settings
 from core.database import Base
 
+if TYPE_CHECKING:
+    from .tenant import Tenant
+
 
 class Document(Base):
     """Document uploaded by tenant."""
     
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_source_metadata_gin", "source_metadata", postgresql_using="gin"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String(255), nullable=False)
-    original_name = Column(String(255), nullable=False)
-    content_type = Column(String(100))
-    file_size = Column(Integer)  # Size in bytes
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    original_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    content_type: Mapped[Optional[str]] = mapped_column(String(100))
+    file_size: Mapped[Optional[int]] = mapped_column(Integer)  # Size in bytes
     
     # Source information
-    source = Column(String(100), default="upload")  # upload, google_drive, sharepoint, etc.
-    source_url = Column(String(500))
-    source_metadata = Column(JSON, default=dict)
+    source: Mapped[Optional[str]] = mapped_column(String(100), default="upload")  # upload, google_drive, sharepoint, etc.
+    source_url: Mapped[Optional[str]] = mapped_column(String(500))
+    source_metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB, default=dict)
     
     # Processing status
-    processing_status = Column(String(20), default="pending")  # pending, processing, completed, failed
-    processing_error = Column(Text)
+    processing_status: Mapped[Optional[str]] = mapped_column(String(20), default="pending")  # pending, processing, completed, failed
+    processing_error: Mapped[Optional[str]] = mapped_column(Text)
     
     # Content
-    extracted_text = Column(Text)
-    chunk_count = Column(Integer, default=0)
+    extracted_text: Mapped[Optional[str]] = mapped_column(Text)
+    chunk_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
     
     # Tenant relationship
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    tenant_id: Mapped[int] = mapped_column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     
     # Timestamps
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
-    processed_at = Column(DateTime)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    uploaded_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    tenant = relationship("Tenant", back_populates="documents")
-    chunks = relationship("ClauseChunk", back_populates="document", cascade="all, delete-orphan")
+    tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="documents")
+    chunks: Mapped[List["ClauseChunk"]] = relationship("ClauseChunk", back_populates="document", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Document(id={self.id}, filename='{self.filename}', status='{self.processing_status}')>"
@@ -50,29 +59,33 @@ class ClauseChunk(Base):
     """Text chunk from a document with embeddings."""
 
     __tablename__ = "clause_chunks"
+    __table_args__ = (
+        # Covers document_id lookups and ordered chunk reads per document
+        Index("ix_clause_chunks_document_chunk", "document_id", "chunk_index"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
     # Content
-    text = Column(Text, nullable=False)
-    chunk_index = Column(Integer, nullable=False)  # Order within document
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)  # Order within document
 
     # Embeddings
-    embedding_id = Column(String(255), unique=True, index=True)  # Qdrant point ID
-    embedding_model = Column(String(100), default="text-embedding-ada-002")
+    embedding_id: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True)  # Qdrant point ID
+    embedding_model: Mapped[Optional[str]] = mapped_column(String(100), default=settings.EMBEDDING_MODEL)
 
     # Metadata (renamed from 'metadata' to avoid SQLAlchemy reserved name clash)
-    chunk_metadata = Column(JSON, default=dict)  # Page number, section, etc.
+    chunk_metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB, default=dict)  # Page number, section, etc.
 
     # Relationships
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id: Mapped[int] = mapped_column(Integer, ForeignKey("documents.id"), nullable=False)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    document = relationship("Document", back_populates="chunks")
+    document: Mapped["Document"] = relationship("Document", back_populates="chunks")
 
     def __repr__(self):
         return f"<ClauseChunk(id={self.id}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
@@ -1,57 +1,76 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, Integer, String, DateTime, Text, ForeignKey, Float, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, joinedload, selectinload
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, List, Optional
 
 from core.database import Base
 
+if TYPE_CHECKING:
+    from .agent import AgentInstance
+    from .tenant import Tenant
+    from .user import User
+
 
 class Interaction(Base):
     """User interaction with an agent."""
     
     __tablename__ = "interactions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    
-    # Content
-    prompt = Column(Text, nullable=False)
-    response = Column(Text, nullable=False)
+    __table_args__ = (
+        # Per-tenant/user/agent history; B-trees scan backwards for newest-first
+        Index("ix_interactions_tenant_ts", "tenant_id", "timestamp"),
+        Index("ix_interactions_user_ts", "user_id", "timestamp"),
+        Index("ix_interactions_agent_ts", "agent_instance_id", "timestamp"),
+        Index("ix_interactions_status_tenant", "status", "tenant_id"),
+        # Small partial index for failure/timeout dashboards and alerting
+        Index("ix_interactions_failed_recent", "tenant_id", "timestamp", postgresql_where=text("status <> 'completed'")),
+        # Trial usage counts since trial start as an index-only scan
+        Index("ix_interactions_tenant_created", "tenant_id", "created_at"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    
+    # Content (deferred as one group; use undefer_group("content") to load)
+    prompt: Mapped[str] = mapped_column(Text, nullable=False, deferred=True, deferred_group="content")
+    response: Mapped[str] = mapped_column(Text, nullable=False, deferred=True, deferred_group="content")
     
     # Model information
-    model = Column(String(100), nullable=False)
-    temperature = Column(Float)
-    tokens_input = Column(Integer)
-    tokens_output = Column(Integer)
-    tokens_total = Column(Integer)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    temperature: Mapped[Optional[float]] = mapped_column(Float)
+    tokens_input: Mapped[Optional[int]] = mapped_column(Integer)
+    tokens_output: Mapped[Optional[int]] = mapped_column(Integer)
+    tokens_total: Mapped[Optional[int]] = mapped_column(Integer)
     
     # Performance metrics
-    response_time_ms = Column(Integer)
-    retrieval_time_ms = Column(Integer)
-    llm_time_ms = Column(Integer)
+    response_time_ms: Mapped[Optional[int]] = mapped_column(Integer)
+    retrieval_time_ms: Mapped[Optional[int]] = mapped_column(Integer)
+    llm_time_ms: Mapped[Optional[int]] = mapped_column(Integer)
     
     # Context used
-    context_chunks = Column(JSON, default=list)  # List of chunk IDs used
-    top_k = Column(Integer)
-    rerank_score = Column(Float)
+    context_chunks: Mapped[Optional[List[Any]]] = mapped_column(JSONB, default=list, deferred=True, deferred_group="content")  # List of chunk IDs used
+    top_k: Mapped[Optional[int]] = mapped_column(Integer)
+    rerank_score: Mapped[Optional[float]] = mapped_column(Float)
     
     # Status
-    status = Column(String(20), default="completed")  # completed, failed, timeout
-    error_message = Column(Text)
+    status: Mapped[Optional[str]] = mapped_column(String(20), default="completed")  # completed, failed, timeout
+    error_message: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group="content")
     
     # Relationships
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    agent_instance_id = Column(Integer, ForeignKey("agent_instances.id"), nullable=False)
+    tenant_id: Mapped[int] = mapped_column(Integer, ForeignKey("tenants.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    agent_instance_id: Mapped[int] = mapped_column(Integer, ForeignKey("agent_instances.id"), nullable=False)
     
     # Timestamps
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    tenant = relationship("Tenant", back_populates="interactions")
-    user = relationship("User", back_populates="interactions")
-    agent_instance = relationship("AgentInstance", back_populates="interactions")
-    feedback = relationship("Feedback", back_populates="interaction", uselist=False, cascade="all, delete-orphan")
+    # Lazy loads would be N+1 (and fail under asyncio); load via interaction_list_options()
+    tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="interactions", lazy="raise")
+    user: Mapped["User"] = relationship("User", back_populates="interactions", lazy="raise")
+    agent_instance: Mapped["AgentInstance"] = relationship("AgentInstance", back_populates="interactions", lazy="raise")
+    feedback: Mapped[Optional["Feedback"]] = relationship("Feedback", back_populates="interaction", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Interaction(id={self.id}, user_id={self.user_id}, status='{self.status}')>"
@@ -61,30 +80,47 @@ class Feedback(Base):
     """User feedback on agent responses."""
     
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_user_created", "user_id", "created_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Feedback content
-    rating = Column(Integer, nullable=False)  # 1-5 scale
-    feedback_type = Column(String(20), default="rating")  # rating, edit, report
-    edit_text = Column(Text)  # User's corrected response
-    comment = Column(Text)
+    rating: Mapped[int] = mapped_column(Integer, nullable=False)  # 1-5 scale
+    feedback_type: Mapped[Optional[str]] = mapped_column(String(20), default="rating")  # rating, edit, report
+    edit_text: Mapped[Optional[str]] = mapped_column(Text)  # User's corrected response
+    comment: Mapped[Optional[str]] = mapped_column(Text)
     
     # Classification
-    category = Column(String(50))  # accuracy, relevance, tone, etc.
-    tags = Column(JSON, default=list)
+    category: Mapped[Optional[str]] = mapped_column(String(50))  # accuracy, relevance, tone, etc.
+    tags: Mapped[Optional[List[Any]]] = mapped_column(JSONB, default=list)
     
     # Relationships
-    interaction_id = Column(Integer, ForeignKey("interactions.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    interaction_id: Mapped[int] = mapped_column(Integer, ForeignKey("interactions.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    interaction = relationship("Interaction", back_populates="feedback")
-    user = relationship("User", back_populates="feedback")
+    interaction: Mapped["Interaction"] = relationship("Interaction", back_populates="feedback")
+    user: Mapped["User"] = relationship("User", back_populates="feedback")
     
     def __repr__(self):
         return f"<Feedback(id={self.id}, interaction_id={self.interaction_id}, rating={self.rating})>"
+
+
+def interaction_list_options():
+    """Eager-load options for interaction listings.
+
+    One IN query per related table instead of one query per row, with the
+    1:1 feedback joined inline.
+    """
+    return (
+        selectinload(Interaction.user),
+        selectinload(Interaction.agent_instance),
+        joinedload(Interaction.feedback),
+    )
+
@@ -1,47 +1,64 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON
-from sqlalchemy.orm import relationship
-from datetime import datetime
-import uuid
+from sqlalchemy import Index, Integer, String, DateTime, Boolean, Text, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from uuid import UUID
 
 from core.database import Base
 
+if TYPE_CHECKING:
+    from .agent import AgentInstance
+    from .billing import BillingRecord, Subscription
+    from .document import Document
+    from .interaction import Interaction
+    from .user import User
+
 
 class Tenant(Base):
     """Tenant model for multi-tenant architecture."""
     
     __tablename__ = "tenants"
+    __table_args__ = (
+        Index("ix_tenants_settings_gin", "settings", postgresql_using="gin", postgresql_ops={"settings": "jsonb_path_ops"}),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, index=True, default=lambda: str(uuid.uuid4()))
-    org_name = Column(String(255), nullable=False)
-    domain = Column(String(255), unique=True, index=True)
-    plan = Column(String(50), default="trial")  # trial, basic, pro, enterprise
-    status = Column(String(20), default="active")  # active, suspended, deleted
-    settings = Column(JSON, default=dict)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    uuid: Mapped[Optional[UUID]] = mapped_column(PG_UUID(as_uuid=True), unique=True, index=True, server_default=text("gen_random_uuid()"))
+    org_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    domain: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True)
+    plan: Mapped[Optional[str]] = mapped_column(String(50), default="trial")  # trial, basic, pro, enterprise
+    status: Mapped[Optional[str]] = mapped_column(String(20), default="active")  # active, suspended, deleted
+    settings: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB, default=dict)
     
     # Billing
-    stripe_customer_id = Column(String(255), unique=True, index=True)
-    billing_email = Column(String(255))
+    stripe_customer_id: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True)
+    billing_email: Mapped[Optional[str]] = mapped_column(String(255))
     
     # Trial limits
-    trial_start_date = Column(DateTime, default=datetime.utcnow)
-    trial_end_date = Column(DateTime)
-    trial_queries_used = Column(Integer, default=0)
-    trial_queries_limit = Column(Integer, default=100)
-    trial_upload_mb_used = Column(Integer, default=0)
-    trial_upload_mb_limit = Column(Integer, default=10)
+    trial_start_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    trial_end_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    trial_queries_used: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    trial_queries_limit: Mapped[Optional[int]] = mapped_column(Integer, default=100)
+    trial_upload_mb_used: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    trial_upload_mb_limit: Mapped[Optional[int]] = mapped_column(Integer, default=10)
+    
+    # Rolling 30-day usage, bumped by the batched interaction writer and
+    # reconciled periodically (see tasks.usage) so dashboards read one row
+    interactions_count_30d: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    tokens_total_30d: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    users = relationship("User", back_populates="tenant", cascade="all, delete-orphan")
-    agent_instances = relationship("AgentInstance", back_populates="tenant", cascade="all, delete-orphan")
-    documents = relationship("Document", back_populates="tenant", cascade="all, delete-orphan")
-    interactions = relationship("Interaction", back_populates="tenant", cascade="all, delete-orphan")
-    billing_records = relationship("BillingRecord", back_populates="tenant", cascade="all, delete-orphan")
-    subscriptions = relationship("Subscription", back_populates="tenant", cascade="all, delete-orphan")
+    users: Mapped[List["User"]] = relationship("User", back_populates="tenant", cascade="all, delete-orphan")
+    agent_instances: Mapped[List["AgentInstance"]] = relationship("AgentInstance", back_populates="tenant", cascade="all, delete-orphan")
+    documents: Mapped[List["Document"]] = relationship("Document", back_populates="tenant", cascade="all, delete-orphan")
+    interactions: Mapped[List["Interaction"]] = relationship("Interaction", back_populates="tenant", cascade="all, delete-orphan")
+    billing_records: Mapped[List["BillingRecord"]] = relationship("BillingRecord", back_populates="tenant", cascade="all, delete-orphan")
+    subscriptions: Mapped[List["Subscription"]] = relationship("Subscription", back_populates="tenant", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Tenant(id={self.id}, org_name='{self.org_name}', plan='{self.plan}')>"
@@ -52,7 +69,7 @@ class Tenant(Base):
         if self.plan != "trial":
             return False
         
-        now = datetime.utcnow()
+        now = datetime.now(timezone.utc)
         if self.trial_end_date and now > self.trial_end_date:
             return False
             
@@ -1,49 +1,64 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, Integer, String, DateTime, Boolean, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, List, Optional, FrozenSet
 
 from core.database import Base
 
+if TYPE_CHECKING:
+    from .interaction import Feedback, Interaction
+    from .tenant import Tenant
+
 
 class User(Base):
     """User model."""
     
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_permissions_gin", "permissions", postgresql_using="gin", postgresql_ops={"permissions": "jsonb_path_ops"}),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), unique=True, index=True, nullable=False)
-    full_name = Column(String(255))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
+    full_name: Mapped[Optional[str]] = mapped_column(String(255))
     
     # Authentication
-    auth_provider = Column(String(50), default="auth0")  # auth0, supabase, local
-    auth_provider_id = Column(String(255), unique=True, index=True)
-    is_verified = Column(Boolean, default=False)
+    auth_provider: Mapped[Optional[str]] = mapped_column(String(50), default="auth0")  # auth0, supabase, local
+    auth_provider_id: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True)
+    is_verified: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
     
     # Role and permissions
-    role = Column(String(50), default="user")  # admin, user, viewer
-    permissions = Column(JSON, default=list)
+    role: Mapped[Optional[str]] = mapped_column(String(50), default="user")  # admin, user, viewer
+    permissions: Mapped[Optional[List[Any]]] = mapped_column(JSONB, default=list)
     
     # Status
-    is_active = Column(Boolean, default=True)
-    last_login = Column(DateTime)
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)
+    last_login: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     
     # Tenant relationship
-    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    tenant_id: Mapped[int] = mapped_column(Integer, ForeignKey("tenants.id"), nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    tenant = relationship("Tenant", back_populates="users")
-    interactions = relationship("Interaction", back_populates="user", cascade="all, delete-orphan")
-    feedback = relationship("Feedback", back_populates="user", cascade="all, delete-orphan")
+    tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="users")
+    interactions: Mapped[List["Interaction"]] = relationship("Interaction", back_populates="user", cascade="all, delete-orphan")
+    feedback: Mapped[List["Feedback"]] = relationship("Feedback", back_populates="user", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
     
+    @cached_property
+    def effective_permissions(self) -> FrozenSet[str]:
+        """Explicit permissions as a set, computed once per loaded instance."""
+        return frozenset(self.permissions or ())
+    
     def has_permission(self, permission: str) -> bool:
         """Check if user has a specific permission."""
         if self.role == "admin":
             return True
-        return permission in (self.permissions or [])
+        return permission in self.effective_permissions
@@ -8,10 +8,11 @@ import os
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from core.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine
+from core.database import build_engine
+from sqlalchemy import text
 import redis.asyncio as redis
-from qdrant_client import QdrantClient, models
-from qdrant_client.http.models import UpdateStatus
+from qdrant_client import AsyncQdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,9 +21,12 @@ async def check_database():
     """Checks the database connection."""
     logging.info("Checking database connection...")
     try:
-        engine = create_async_engine(settings.database_url, echo=False)
-        async with engine.connect() as connection:
-            await connection.execute("SELECT 1")
+        engine = build_engine(echo=False)
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
         logging.info("✅ Database connection successful.")
         return True
     except Exception as e:
@@ -44,32 +48,28 @@ async def check_redis():
 async def check_qdrant():
     """Checks the Qdrant connection and a basic operation."""
     logging.info("Checking Qdrant connection...")
+    client = AsyncQdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
     try:
-        client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
-
-        # Check health
-        health_check_result = client.health_check()
-        if not health_check_result:
-             raise Exception(f"Qdrant health check failed: {health_check_result}")
+        # Connectivity check
+        await client.get_collections()
         logging.info("Qdrant health check passed.")
 
         # Perform a basic operation (create and delete a test collection)
         test_collection_name = "env_check_test_collection"
 
-        # Ensure the test collection doesn't exist
         try:
-            client.get_collection(collection_name=test_collection_name)
-            logging.info(f"Deleting pre-existing test collection: {test_collection_name}")
-            client.delete_collection(collection_name=test_collection_name)
-        except Exception:
-            pass # Collection does not exist, which is good
-
-        client.recreate_collection(
-            collection_name=test_collection_name,
-            vectors_config=models.VectorParams(size=4, distance=models.Distance.DOT),
-        )
-
-        client.upsert(
+            await client.create_collection(
+                collection_name=test_collection_name,
+                vectors_config=models.VectorParams(size=4, distance=models.Distance.DOT),
+                on_disk_payload=True,
+            )
+        except UnexpectedResponse as e:
+            # Left over from an interrupted run; reuse it
+            if e.status_code != 409:
+                raise
+
+        # Each step depends on the previous one, so these stay sequential
+        await client.upsert(
             collection_name=test_collection_name,
             points=[
                 models.PointStruct(
@@ -82,13 +82,15 @@ async def check_qdrant():
         )
 
         # Clean up the test collection
-        client.delete_collection(collection_name=test_collection_name)
+        await client.delete_collection(collection_name=test_collection_name)
 
         logging.info("✅ Qdrant connection and basic operations successful.")
         return True
     except Exception as e:
         logging.error(f"❌ Qdrant connection failed: {e}")
         return False
+    finally:
+        await client.close()
 
 async def main():
     """Runs all environment checks."""
@@ -103,11 +105,18 @@ async def main():
     else:
         logging.warning(f".env file not found at {dotenv_path}. Checks might fail.")
 
-    db_ok = await check_database()
-    redis_ok = await check_redis()
-    qdrant_ok = await check_qdrant()
-
-    if all([db_ok, redis_ok, qdrant_ok]):
+    # The checks are independent network round-trips, so run them concurrently
+    results = await asyncio.gather(
+        check_database(),
+        check_redis(),
+        check_qdrant(),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            logging.error(f"❌ Check raised unexpectedly: {result}")
+
+    if all(result is True for result in results):
         logging.info("🎉 All environment checks passed successfully!")
         sys.exit(0)
     else:
@@ -1,19 +1,47 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage, AIMessage
 from langchain.prompts import ChatPromptTemplate
 from langgraph.graph import Graph, StateGraph, END
 from dataclasses import dataclass
+import hashlib
 import json
+import re
 import time
 import logging
 
+from cachetools import LRUCache
+
 from core.config import settings
-from services.vector_store import VectorStoreService
+from services.vector_store import get_vector_store
+from services.query_cache import query_cache
 
 logger = logging.getLogger(__name__)
 
 
+# Sub-question boundaries: question marks, semicolons, newlines and "and also"
+_SUBQUERY_SPLIT_RE = re.compile(r"(?<=\?)\s+|\s*;\s*|\s*\n+\s*|\s+and also\s+", re.IGNORECASE)
+_MAX_SUBQUERIES = 4
+
+
+def _decompose_query(query: str) -> List[str]:
+    """Split a compound query into independent sub-queries (at most a few)."""
+    parts = [part.strip() for part in _SUBQUERY_SPLIT_RE.split(query)]
+    subqueries = [part for part in parts if len(part.split()) >= 2][:_MAX_SUBQUERIES]
+    return subqueries or [query]
+
+
+def _merge_results(batches: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """Deduplicate hits by chunk id, keeping the best score, and return the top_k."""
+    best: Dict[Any, Dict[str, Any]] = {}
+    for batch in batches:
+        for result in batch:
+            current = best.get(result["id"])
+            if current is None or result["score"] > current["score"]:
+                best[result["id"]] = result
+    return sorted(best.values(), key=lambda r: r["score"], reverse=True)[:top_k]
+
+
 @dataclass
 class AgentState:
     """State for agent execution."""
@@ -34,8 +62,19 @@ class AgentOrchestrator:
             temperature=agent_config.get("temperature", 0.7),
             openai_api_key=settings.OPENAI_API_KEY
         )
-        self.vector_store = VectorStoreService()
+        self.vector_store = get_vector_store()
+        system_prompt = agent_config.get("system_prompt",
+            "You are a helpful AI assistant. Use the provided context to answer questions accurately.")
+        # Parsed once; context and query are substituted per request
+        self._prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("human", "Context:\n{context}\n\nQuestion: {query}")
+        ])
         self.graph = self._build_graph()
+        # Cached answers are scoped to this exact config (tenant collection,
+        # prompt, model); a TTL of 0 disables caching for the agent.
+        self._cache_scope = _config_key(agent_config)
+        self._cache_ttl = agent_config.get("query_cache_ttl", query_cache.ttl)
     
     def _build_graph(self) -> StateGraph:
         """Build the agent execution graph."""
@@ -64,12 +103,23 @@ class AgentOrchestrator:
                 logger.warning("No collection name configured for retrieval")
                 return state
             
-            # Search for relevant documents
-            results = await self.vector_store.search_documents(
-                collection_name=collection_name,
-                query=state.query,
-                top_k=self.config.get("top_k", 5)
-            )
+            # Search for relevant documents, batching compound queries into one request
+            top_k = self.config.get("top_k", 5)
+            subqueries = _decompose_query(state.query) if self.config.get("decompose", False) else [state.query]
+            if len(subqueries) == 1:
+                results = await self.vector_store.search_documents(
+                    collection_name=collection_name,
+                    query=subqueries[0],
+                    top_k=top_k
+                )
+            else:
+                batches = await self.vector_store.search_documents_multi(
+                    collection_name=collection_name,
+                    queries=subqueries,
+                    top_k=top_k
+                )
+                results = _merge_results(batches, top_k)
+                state.metadata["subqueries"] = len(subqueries)
             
             # Extract context text
             context = [result["text"] for result in results]
@@ -87,30 +137,27 @@ class AgentOrchestrator:
             state.error = f"Retrieval error: {str(e)}"
             return state
     
+    def _build_messages(self, state: AgentState) -> List[Any]:
+        """Build the chat messages for the LLM from the retrieved context."""
+        context_text = "\n\n".join(state.context) if state.context else "No relevant context found."
+        return self._prompt.format_messages(context=context_text, query=state.query)
+    
+    async def _stream_tokens(self, messages: List[Any]) -> AsyncIterator[str]:
+        """Yield non-empty text chunks from the LLM as they arrive."""
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
+    
     async def _generate_response(self, state: AgentState) -> AgentState:
         """Generate response using LLM."""
         try:
-            # Build prompt
-            system_prompt = self.config.get("system_prompt", 
-                "You are a helpful AI assistant. Use the provided context to answer questions accurately.")
-            
-            context_text = "\n\n".join(state.context) if state.context else "No relevant context found."
-            
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("human", f"Context:\n{context_text}\n\nQuestion: {state.query}")
-            ])
-            
-            # Generate response
+            # Generate response, collecting the stream for non-streaming callers
             start_time = time.time()
-            messages = prompt.format_messages()
-            response = await self.llm.agenerate([messages])
-            
-            # Extract response text
-            response_text = response.generations[0][0].text
+            messages = self._build_messages(state)
+            chunks = [text async for text in self._stream_tokens(messages)]
             
             # Update state
-            state.response = response_text
+            state.response = "".join(chunks)
             state.metadata["generation_time_ms"] = int((time.time() - start_time) * 1000)
             state.metadata["model"] = self.config.get("model", "gpt-3.5-turbo")
             
@@ -150,6 +197,11 @@ class AgentOrchestrator:
     async def execute(self, query: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Execute the agent workflow."""
         try:
+            if self._cache_ttl:
+                cached = await query_cache.get(self._cache_scope, query)
+                if cached is not None:
+                    return {**cached, "execution_time_ms": 0, "cached": True}
+            
             # Initialize state
             initial_state = AgentState(
                 query=query,
@@ -164,7 +216,7 @@ class AgentOrchestrator:
             total_time = int((time.time() - start_time) * 1000)
             
             # Return results
-            return {
+            result = {
                 "response": final_state.response,
                 "context_used": len(final_state.context),
                 "execution_time_ms": total_time,
@@ -172,6 +224,9 @@ class AgentOrchestrator:
                 "error": final_state.error,
                 "success": final_state.error is None
             }
+            if self._cache_ttl and result["success"]:
+                await query_cache.set(self._cache_scope, query, result, ttl=self._cache_ttl)
+            return result
             
         except Exception as e:
             logger.error(f"Error executing agent: {e}")
@@ -185,43 +240,108 @@ class AgentOrchestrator:
             }
 
 
+    def new_state(self, query: str, metadata: Optional[Dict[str, Any]] = None) -> AgentState:
+        """Create a fresh execution state for ``astream``."""
+        return AgentState(query=query, context=[], response="", metadata=metadata or {})
+    
+    async def astream(self, state: AgentState) -> AsyncIterator[str]:
+        """Retrieve context, then yield response text chunks as the LLM emits them.
+        
+        The caller owns ``state``; once the iterator is exhausted it holds the
+        full response, context, metadata and any error.
+        """
+        start_time = time.time()
+        if self._cache_ttl:
+            cached = await query_cache.get(self._cache_scope, state.query)
+            if cached is not None:
+                state.response = cached["response"]
+                state.context = cached["context"]
+                state.metadata.update(cached["metadata"], cached=True)
+                state.metadata["execution_time_ms"] = int((time.time() - start_time) * 1000)
+                yield state.response
+                return
+        
+        state = await self._retrieve_context(state)
+        
+        try:
+            messages = self._build_messages(state)
+            chunks: List[str] = []
+            async for text in self._stream_tokens(messages):
+                chunks.append(text)
+                yield text
+            state.response = "".join(chunks).strip()
+            state.metadata["model"] = self.config.get("model", "gpt-3.5-turbo")
+            if self._cache_ttl and state.error is None and state.response:
+                await query_cache.set(self._cache_scope, state.query, {
+                    "response": state.response,
+                    "context": state.context,
+                    "metadata": {"model": state.metadata["model"]},
+                }, ttl=self._cache_ttl)
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            state.error = f"Generation error: {str(e)}"
+        finally:
+            state.metadata["execution_time_ms"] = int((time.time() - start_time) * 1000)
+
+
+# Default configurations for different agent types
+_DEFAULT_CONFIGS: Dict[str, Dict[str, Any]] = {
+    "hr_assistant": {
+        "system_prompt": """You are an HR assistant AI. Help with HR-related questions using the provided context.
+        Focus on being helpful, accurate, and compliant with employment laws.
+        If you're unsure about something, recommend consulting with HR professionals.""",
+        "model": "gpt-3.5-turbo",
+        "temperature": 0.3,
+        "top_k": 5
+    },
+    "sales_ops": {
+        "system_prompt": """You are a Sales Operations AI assistant. Help with sales processes, 
+        lead management, pipeline analysis, and sales strategy using the provided context.
+        Be data-driven and focus on actionable insights.""",
+        "model": "gpt-4",
+        "temperature": 0.4,
+        "top_k": 7
+    },
+    "legal": {
+        "system_prompt": """You are a Legal AI assistant. Provide guidance on legal matters 
+        using the provided context. Always remind users that this is not legal advice 
+        and they should consult with qualified attorneys for specific legal matters.""",
+        "model": "gpt-4",
+        "temperature": 0.1,
+        "top_k": 8
+    }
+}
+
+# Built orchestrators keyed by a digest of their merged config
+_orchestrator_cache: LRUCache = LRUCache(maxsize=128)
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    """Canonical digest of a (possibly nested) agent config."""
+    return hashlib.blake2b(
+        json.dumps(config, sort_keys=True, default=str).encode(), digest_size=16
+    ).hexdigest()
+
+
 class AgentFactory:
     """Factory for creating agent instances."""
     
     @staticmethod
     def create_agent(agent_type: str, config: Dict[str, Any]) -> AgentOrchestrator:
-        """Create an agent instance based on type and configuration."""
-        
-        # Default configurations for different agent types
-        default_configs = {
-            "hr_assistant": {
-                "system_prompt": """You are an HR assistant AI. Help with HR-related questions using the provided context.
-                Focus on being helpful, accurate, and compliant with employment laws.
-                If you're unsure about something, recommend consulting with HR professionals.""",
-                "model": "gpt-3.5-turbo",
-                "temperature": 0.3,
-                "top_k": 5
-            },
-            "sales_ops": {
-                "system_prompt": """You are a Sales Operations AI assistant. Help with sales processes, 
-                lead management, pipeline analysis, and sales strategy using the provided context.
-                Be data-driven and focus on actionable insights.""",
-                "model": "gpt-4",
-                "temperature": 0.4,
-                "top_k": 7
-            },
-            "legal": {
-                "system_prompt": """You are a Legal AI assistant. Provide guidance on legal matters 
-                using the provided context. Always remind users that this is not legal advice 
-                and they should consult with qualified attorneys for specific legal matters.""",
-                "model": "gpt-4",
-                "temperature": 0.1,
-                "top_k": 8
-            }
-        }
+        """Return an agent for the type and configuration, built once per config."""
         
         # Merge default config with provided config
-        base_config = default_configs.get(agent_type, default_configs["hr_assistant"])
+        base_config = _DEFAULT_CONFIGS.get(agent_type, _DEFAULT_CONFIGS["hr_assistant"])
         merged_config = {**base_config, **config}
         
-        return AgentOrchestrator(merged_config)
+        key = _config_key(merged_config)
+        agent = _orchestrator_cache.get(key)
+        if agent is None:
+            agent = AgentOrchestrator(merged_config)
+            _orchestrator_cache[key] = agent
+        return agent
+    
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop all cached agents."""
+        _orchestrator_cache.clear()
@@ -0,0 +1,70 @@
+from typing import Optional, Any
+import logging
+
+import orjson
+import redis.asyncio as redis
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """Redis cache of serialized agent catalog responses.
+
+    Payloads are stored as pre-encoded JSON bytes keyed by the query filters, so
+    a hit is returned without touching Postgres or re-serializing. Redis errors
+    are logged and treated as misses.
+
+    No API path writes agent types yet, so catalog edits made directly in the
+    database show up once ``ttl`` expires. Any code that adds or changes
+    AgentType rows should call ``invalidate`` after committing.
+    """
+
+    def __init__(self, ttl: int = 300, prefix: str = "catalog:"):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL)
+        return self._client
+
+    def _key(self, category: Optional[str], featured_only: bool) -> str:
+        return f"{self.prefix}{category or '*'}:{int(featured_only)}"
+
+    async def get(self, category: Optional[str], featured_only: bool) -> Optional[bytes]:
+        try:
+            return await self.client.get(self._key(category, featured_only))
+        except Exception as e:
+            logger.debug(f"Catalog cache lookup failed: {e}")
+            return None
+
+    async def set(self, category: Optional[str], featured_only: bool, payload: Any) -> bytes:
+        """Serialize and cache payload, returning the encoded bytes."""
+        body = orjson.dumps(payload)
+        try:
+            await self.client.set(self._key(category, featured_only), body, ex=self.ttl)
+        except Exception as e:
+            logger.debug(f"Catalog cache store failed: {e}")
+        return body
+
+    async def invalidate(self) -> None:
+        """Drop every cached catalog variant (call after AgentType changes)."""
+        try:
+            keys = [key async for key in self.client.scan_iter(match=f"{self.prefix}*")]
+            if keys:
+                await self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Catalog cache invalidation failed: {e}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+catalog_cache = CatalogCache()
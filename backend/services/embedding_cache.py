@@ -0,0 +1,76 @@
+from typing import Optional
+import hashlib
+import logging
+
+import numpy as np
+import redis.asyncio as redis
+from cachetools import LRUCache
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Two-tier cache of query embeddings: in-process LRU in front of Redis.
+
+    Keys are the SHA-256 of the embedding model and the normalized query.
+    Redis holds raw float16 bytes (half the size of float32) so the entry is
+    shared across workers; the in-process tier keeps float32 arrays. Redis
+    errors are logged and treated as misses.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 86400, prefix: str = "ns:emb:"):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local: LRUCache = LRUCache(maxsize=maxsize)
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL)
+        return self._client
+
+    @staticmethod
+    def _digest(model: str, query: str) -> str:
+        return hashlib.sha256(f"{model}\x00{query.strip().lower()}".encode()).hexdigest()
+
+    async def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        digest = self._digest(model, query)
+        vector = self._local.get(digest)
+        if vector is not None:
+            return vector
+
+        try:
+            raw = await self.client.get(self.prefix + digest)
+        except Exception as e:
+            logger.debug(f"Embedding cache lookup failed: {e}")
+            return None
+        if raw is None:
+            return None
+
+        vector = np.frombuffer(raw, dtype=np.float16).astype(np.float32)
+        self._local[digest] = vector
+        return vector
+
+    async def set(self, model: str, query: str, vector: np.ndarray) -> None:
+        digest = self._digest(model, query)
+        self._local[digest] = vector
+        try:
+            await self.client.set(
+                self.prefix + digest,
+                np.asarray(vector, dtype=np.float16).tobytes(),
+                ex=self.ttl
+            )
+        except Exception as e:
+            logger.debug(f"Embedding cache store failed: {e}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,140 @@
+from typing import Optional, Dict, Any, List, Tuple
+from collections import Counter
+import asyncio
+import logging
+
+from sqlalchemy import insert, update, func
+
+from core import database
+from models.agent import AgentInstance
+from models.interaction import Interaction
+from models.tenant import Tenant
+
+logger = logging.getLogger(__name__)
+
+# (interaction row, tenant id whose trial counter must be bumped in Postgres)
+_Item = Tuple[Dict[str, Any], Optional[int]]
+
+
+class InteractionWriter:
+    """Buffers finished interactions and writes them in batches.
+
+    A background task drains the queue every ``interval`` seconds or once
+    ``batch_size`` rows are waiting, issuing one multi-row INSERT plus one
+    counter UPDATE per agent instance and per tenant instead of a
+    round-trip per query.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        interval: float = 0.1,
+        maxsize: int = 10000,
+        max_attempts: int = 3
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue[_Item] = asyncio.Queue(maxsize=maxsize)
+        # Rows taken off the queue but not yet handed to a write; kept on the
+        # instance so cancelling run() mid-collection never loses them
+        self._pending: List[_Item] = []
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def add(self, row: Dict[str, Any], trial_tenant_id: Optional[int] = None) -> None:
+        """Queue an interaction row; writes inline if the buffer is full."""
+        try:
+            self._queue.put_nowait((row, trial_tenant_id))
+        except asyncio.QueueFull:
+            logger.warning("Interaction buffer full; writing inline")
+            await self._write([(row, trial_tenant_id)])
+
+    async def run(self) -> None:
+        """Write batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._pending.append(await self._queue.get())
+            deadline = loop.time() + self.interval
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._pending = self._pending, []
+            # Shielded so cancellation never interrupts a write mid-commit;
+            # flush() waits for it instead
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def flush(self) -> None:
+        """Write everything not yet written (call on shutdown, after cancelling run)."""
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        batch, self._pending = self._pending, []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self._write(batch)
+                batch = []
+        if batch:
+            await self._write(batch)
+
+    async def _write(self, batch: List[_Item]) -> None:
+        """Write a batch, retrying with backoff before giving up on it."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._write_once(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Dropping {len(batch)} interactions after {attempt} attempts: {e}")
+                    return
+                logger.warning(f"Failed to record {len(batch)} interactions (attempt {attempt}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+    async def _write_once(self, batch: List[_Item]) -> None:
+        rows = [row for row, _ in batch]
+        queries: Counter = Counter(row["agent_instance_id"] for row in rows)
+        tokens: Counter = Counter()
+        for row in rows:
+            tokens[row["agent_instance_id"]] += row.get("tokens_total") or 0
+        tenant_queries: Counter = Counter(row["tenant_id"] for row in rows)
+        tenant_tokens: Counter = Counter()
+        for row in rows:
+            tenant_tokens[row["tenant_id"]] += row.get("tokens_total") or 0
+        trial_queries = Counter(tenant_id for _, tenant_id in batch if tenant_id is not None)
+
+        async with database.AsyncSessionLocal() as session:
+            await session.execute(insert(Interaction), rows)
+            # Sorted so concurrent workers take row locks in the same order
+            for instance_id, count in sorted(queries.items()):
+                await session.execute(
+                    update(AgentInstance)
+                    .where(AgentInstance.id == instance_id)
+                    .values(
+                        queries_count=AgentInstance.queries_count + count,
+                        tokens_used=AgentInstance.tokens_used + tokens[instance_id],
+                        last_used=func.now()
+                    )
+                )
+            # One UPDATE per tenant per batch for the 30-day aggregates (and
+            # trial counts Redis couldn't take), instead of one per row
+            for tenant_id, count in sorted(tenant_queries.items()):
+                values = {
+                    "interactions_count_30d": Tenant.interactions_count_30d + count,
+                    "tokens_total_30d": Tenant.tokens_total_30d + tenant_tokens[tenant_id],
+                }
+                if trial_queries[tenant_id]:
+                    values["trial_queries_used"] = Tenant.trial_queries_used + trial_queries[tenant_id]
+                await session.execute(update(Tenant).where(Tenant.id == tenant_id).values(**values))
+            await session.commit()
+
+
+# Global instance
+interaction_writer = InteractionWriter()
@@ -0,0 +1,65 @@
+from typing import Optional, Dict, Any
+import hashlib
+import logging
+import re
+
+import orjson
+import redis.asyncio as redis
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def canonicalize(query: str) -> str:
+    """Normalize trivial phrasing differences: case, whitespace, trailing punctuation."""
+    return _WHITESPACE_RE.sub(" ", query.strip().lower()).rstrip("?.!")
+
+
+class QueryCache:
+    """Redis cache of agent answers keyed by ``(scope, canonical query)``.
+
+    ``scope`` identifies the tenant's agent configuration so answers never
+    cross tenants or prompt changes. Redis errors are logged and treated as
+    misses.
+    """
+
+    def __init__(self, ttl: int = 300, prefix: str = "ao:"):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL)
+        return self._client
+
+    def _key(self, scope: str, query: str) -> str:
+        digest = hashlib.blake2b(f"{scope}:{canonicalize(query)}".encode(), digest_size=16).hexdigest()
+        return self.prefix + digest
+
+    async def get(self, scope: str, query: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = await self.client.get(self._key(scope, query))
+        except Exception as e:
+            logger.debug(f"Query cache lookup failed: {e}")
+            return None
+        return orjson.loads(value) if value is not None else None
+
+    async def set(self, scope: str, query: str, result: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        try:
+            await self.client.set(self._key(scope, query), orjson.dumps(result), ex=ttl or self.ttl)
+        except Exception as e:
+            logger.debug(f"Query cache store failed: {e}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+query_cache = QueryCache()
@@ -1,38 +1,155 @@
 from supabase import create_client, Client
 from typing import Optional, Dict, Any
+import asyncio
 import logging
+import time
 from datetime import datetime
 
+import httpx
+from jose import jwt, JWTError
+
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Supabase signing keys keyed by ``kid``, refreshed when a token arrives
+# signed with an unknown key or the set is older than JWKS_TTL_SECONDS (so
+# revoked keys stop verifying).
+_jwks: Dict[str, Dict[str, Any]] = {}
+_jwks_lock = asyncio.Lock()
+_jwks_fetched_at = 0.0
+JWKS_TTL_SECONDS = 3600
+
+JWT_AUDIENCE = "authenticated"
+ASYMMETRIC_ALGORITHMS = ["ES256", "RS256"]
+
+# One pooled HTTP/2 client for all GoTrue calls, closed in the app lifespan.
+_http_client = httpx.AsyncClient(
+    base_url=settings.SUPABASE_URL.rstrip("/"),
+    headers={"apikey": settings.SUPABASE_ANON_KEY},
+    http2=True,
+    timeout=5.0,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+
+
+def _bearer(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _error_message(data: Dict[str, Any], default: str) -> str:
+    return data.get("error_description") or data.get("msg") or data.get("error") or default
+
+
+async def close_http_client() -> None:
+    """Close the shared GoTrue HTTP client."""
+    await _http_client.aclose()
+
 
 class SupabaseAuth:
     """Supabase authentication service."""
     
     def __init__(self):
-        self.client: Client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_ANON_KEY
-        )
         self.admin_client: Client = create_client(
             settings.SUPABASE_URL,
             settings.SUPABASE_SERVICE_KEY
         )
     
+    @property
+    def issuer(self) -> str:
+        return f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1"
+
+    async def refresh_jwks(self, stale_before: Optional[float] = None) -> None:
+        """Fetch the project's JWKS and replace the cached key set.
+
+        With ``stale_before``, skip the fetch if another caller refreshed
+        after that time while this one waited for the lock.
+        """
+        global _jwks_fetched_at
+        async with _jwks_lock:
+            if stale_before is not None and _jwks_fetched_at > stale_before:
+                return
+            response = await _http_client.get("/auth/v1/.well-known/jwks.json")
+            response.raise_for_status()
+            keys = response.json().get("keys", [])
+            _jwks.clear()
+            _jwks.update({key["kid"]: key for key in keys if "kid" in key})
+            _jwks_fetched_at = time.monotonic()
+            logger.info(f"Loaded {len(_jwks)} Supabase signing keys")
+
+    async def _get_signing_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not kid:
+            return None
+        if kid not in _jwks or time.monotonic() - _jwks_fetched_at > JWKS_TTL_SECONDS:
+            try:
+                await self.refresh_jwks(stale_before=_jwks_fetched_at)
+            except Exception as e:
+                logger.warning(f"JWKS refresh failed: {e}")
+        return _jwks.get(kid)
+
+    @staticmethod
+    def _claims_to_user(claims: Dict[str, Any]) -> Dict[str, Any]:
+        user_metadata = claims.get("user_metadata") or {}
+        return {
+            "id": claims.get("sub"),
+            "email": claims.get("email"),
+            "email_confirmed": bool(user_metadata.get("email_verified", False)),
+            "created_at": None,
+            "user_metadata": user_metadata,
+            "app_metadata": claims.get("app_metadata") or {},
+            "exp": claims.get("exp"),
+        }
+
+    async def verify_token_local(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verify JWT signature locally and return user data.
+
+        HS256 tokens are checked against ``SUPABASE_JWT_SECRET``; asymmetric
+        tokens against the cached JWKS. Falls back to the remote
+        ``verify_token`` call only when the signing key cannot be resolved.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            return None
+
+        alg = header.get("alg")
+        if alg == "HS256":
+            key: Any = settings.SUPABASE_JWT_SECRET
+            algorithms = ["HS256"]
+        else:
+            key = await self._get_signing_key(header.get("kid"))
+            if key is None:
+                logger.warning("Unknown JWT signing key; falling back to remote verification")
+                return await self.verify_token(token)
+            algorithms = ASYMMETRIC_ALGORITHMS
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=algorithms,
+                audience=JWT_AUDIENCE,
+                issuer=self.issuer,
+            )
+        except JWTError as e:
+            logger.info(f"Local token verification failed: {e}")
+            return None
+
+        return self._claims_to_user(claims)
+
     async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Verify JWT token and return user data."""
+        """Verify JWT token remotely against Supabase and return user data."""
         try:
-            response = self.client.auth.get_user(token)
-            if response.user:
+            response = await _http_client.get("/auth/v1/user", headers=_bearer(token))
+            if response.status_code == 200:
+                user = response.json()
                 return {
-                    "id": response.user.id,
-                    "email": response.user.email,
-                    "email_confirmed": response.user.email_confirmed_at is not None,
-                    "created_at": response.user.created_at,
-                    "user_metadata": response.user.user_metadata,
-                    "app_metadata": response.user.app_metadata
+                    "id": user.get("id"),
+                    "email": user.get("email"),
+                    "email_confirmed": user.get("email_confirmed_at") is not None,
+                    "created_at": user.get("created_at"),
+                    "user_metadata": user.get("user_metadata") or {},
+                    "app_metadata": user.get("app_metadata") or {}
                 }
             return None
         except Exception as e:
@@ -42,28 +159,30 @@ class SupabaseAuth:
     async def sign_up(self, email: str, password: str, metadata: Optional[Dict] = None) -> Dict[str, Any]:
         """Sign up a new user."""
         try:
-            response = self.client.auth.sign_up({
+            response = await _http_client.post("/auth/v1/signup", json={
                 "email": email,
                 "password": password,
-                "options": {
-                    "data": metadata or {}
-                }
+                "data": metadata or {}
             })
+            data = response.json()
             
-            if response.user:
+            # GoTrue returns the bare user when email confirmation is pending,
+            # otherwise a session wrapping the user.
+            user = data.get("user") if "user" in data else data
+            if response.is_success and user and user.get("id"):
                 return {
                     "success": True,
                     "user": {
-                        "id": response.user.id,
-                        "email": response.user.email,
-                        "email_confirmed": response.user.email_confirmed_at is not None
+                        "id": user["id"],
+                        "email": user.get("email"),
+                        "email_confirmed": user.get("email_confirmed_at") is not None
                     },
-                    "session": response.session.access_token if response.session else None
+                    "session": data.get("access_token")
                 }
             else:
                 return {
                     "success": False,
-                    "error": "Failed to create user"
+                    "error": _error_message(data, "Failed to create user")
                 }
         except Exception as e:
             logger.error(f"Sign up failed: {e}")
@@ -75,27 +194,30 @@ class SupabaseAuth:
     async def sign_in(self, email: str, password: str) -> Dict[str, Any]:
         """Sign in with email and password."""
         try:
-            response = self.client.auth.sign_in_with_password({
-                "email": email,
-                "password": password
-            })
+            response = await _http_client.post(
+                "/auth/v1/token",
+                params={"grant_type": "password"},
+                json={"email": email, "password": password}
+            )
+            data = response.json()
             
-            if response.session:
+            if response.is_success and data.get("access_token"):
+                user = data.get("user") or {}
                 return {
                     "success": True,
-                    "access_token": response.session.access_token,
-                    "refresh_token": response.session.refresh_token,
-                    "expires_at": response.session.expires_at,
+                    "access_token": data["access_token"],
+                    "refresh_token": data.get("refresh_token"),
+                    "expires_at": data.get("expires_at"),
                     "user": {
-                        "id": response.user.id,
-                        "email": response.user.email,
-                        "email_confirmed": response.user.email_confirmed_at is not None
+                        "id": user.get("id"),
+                        "email": user.get("email"),
+                        "email_confirmed": user.get("email_confirmed_at") is not None
                     }
                 }
             else:
                 return {
                     "success": False,
-                    "error": "Invalid credentials"
+                    "error": _error_message(data, "Invalid credentials")
                 }
         except Exception as e:
             logger.error(f"Sign in failed: {e}")
@@ -107,19 +229,24 @@ class SupabaseAuth:
     async def refresh_session(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh access token."""
         try:
-            response = self.client.auth.refresh_session(refresh_token)
+            response = await _http_client.post(
+                "/auth/v1/token",
+                params={"grant_type": "refresh_token"},
+                json={"refresh_token": refresh_token}
+            )
+            data = response.json()
             
-            if response.session:
+            if response.is_success and data.get("access_token"):
                 return {
                     "success": True,
-                    "access_token": response.session.access_token,
-                    "refresh_token": response.session.refresh_token,
-                    "expires_at": response.session.expires_at
+                    "access_token": data["access_token"],
+                    "refresh_token": data.get("refresh_token"),
+                    "expires_at": data.get("expires_at")
                 }
             else:
                 return {
                     "success": False,
-                    "error": "Failed to refresh token"
+                    "error": _error_message(data, "Failed to refresh token")
                 }
         except Exception as e:
             logger.error(f"Token refresh failed: {e}")
@@ -131,8 +258,8 @@ class SupabaseAuth:
     async def sign_out(self, access_token: str) -> bool:
         """Sign out user."""
         try:
-            self.client.auth.sign_out(access_token)
-            return True
+            response = await _http_client.post("/auth/v1/logout", headers=_bearer(access_token))
+            return response.is_success
         except Exception as e:
             logger.error(f"Sign out failed: {e}")
             return False
@@ -140,7 +267,9 @@ class SupabaseAuth:
     async def update_user_metadata(self, user_id: str, metadata: Dict[str, Any]) -> bool:
         """Update user metadata (admin only)."""
         try:
-            response = self.admin_client.auth.admin.update_user_by_id(
+            # supabase-py is synchronous; keep it off the event loop
+            response = await asyncio.to_thread(
+                self.admin_client.auth.admin.update_user_by_id,
                 user_id,
                 {"user_metadata": metadata}
             )
@@ -0,0 +1,68 @@
+from typing import Optional, Dict, Any, Tuple
+import asyncio
+import hashlib
+import logging
+import time
+
+from cachetools import TTLCache
+from jose import jwt
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """Short-lived in-process cache of verified Supabase token claims.
+
+    Entries are keyed by the SHA-256 digest of the token (never the raw token)
+    and expire after ``ttl`` seconds or at the token's ``exp`` claim, whichever
+    comes first.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 5.0):
+        self.ttl = ttl
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    @staticmethod
+    def _token_exp(token: str) -> Optional[float]:
+        """Read the ``exp`` claim without verifying (verification happens on miss)."""
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+            return float(exp) if exp is not None else None
+        except Exception:
+            return None
+
+    async def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return cached user data for token, or None on miss/expiry."""
+        key = self._key(token)
+        async with self._lock:
+            entry: Optional[Tuple[Dict[str, Any], float]] = self._cache.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if time.time() >= expires_at:
+                self._cache.pop(key, None)
+                return None
+            return user
+
+    async def set(self, token: str, user: Dict[str, Any]) -> None:
+        """Cache verified user data, bounded by the token's own expiry."""
+        expires_at = time.time() + self.ttl
+        token_exp = self._token_exp(token)
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        async with self._lock:
+            self._cache[self._key(token)] = (user, expires_at)
+
+    async def invalidate(self, token: str) -> None:
+        """Drop a token from the cache (e.g. on logout)."""
+        async with self._lock:
+            self._cache.pop(self._key(token), None)
+
+
+# Global instance
+token_cache = TokenCache()
@@ -0,0 +1,114 @@
+from typing import Optional
+import asyncio
+import logging
+
+import redis.asyncio as redis
+from sqlalchemy import update
+
+from core import database
+from core.config import settings
+from models.tenant import Tenant
+
+logger = logging.getLogger(__name__)
+
+
+class TrialUsageCache:
+    """Redis-side trial query counters, flushed to Postgres in batches.
+
+    Each trial query is an ``INCR`` on ``tenant:{id}:q`` instead of an
+    ``UPDATE tenants`` per query; ``flush`` folds the pending counts into
+    ``trial_queries_used``. Trial checks add the pending count to the loaded
+    tenant row. If Redis is unavailable, callers fall back to direct updates.
+    """
+
+    def __init__(self, prefix: str = "tenant:"):
+        self.prefix = prefix
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._client
+
+    @property
+    def _pending_key(self) -> str:
+        return f"{self.prefix}pending"
+
+    def _queries_key(self, tenant_id: int) -> str:
+        return f"{self.prefix}{tenant_id}:q"
+
+    async def pending_queries(self, tenant_id: int) -> int:
+        try:
+            value = await self.client.get(self._queries_key(tenant_id))
+        except Exception as e:
+            logger.debug(f"Trial usage lookup failed: {e}")
+            return 0
+        return int(value) if value is not None else 0
+
+    async def is_active(self, tenant: Tenant) -> bool:
+        """``Tenant.is_trial_active`` including queries not yet flushed."""
+        if not tenant.is_trial_active:
+            return False
+        pending = await self.pending_queries(tenant.id)
+        return tenant.trial_queries_used + pending < tenant.trial_queries_limit
+
+    async def record_query(self, tenant_id: int) -> bool:
+        """Count one trial query; False means the caller must update Postgres itself."""
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.incr(self._queries_key(tenant_id))
+                pipe.sadd(self._pending_key, tenant_id)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Trial usage increment failed: {e}")
+            return False
+
+    async def flush(self) -> None:
+        """Move pending per-tenant counts into ``tenants.trial_queries_used``."""
+        try:
+            tenant_ids = await self.client.smembers(self._pending_key)
+        except Exception as e:
+            logger.warning(f"Trial usage flush skipped: {e}")
+            return
+
+        for raw_id in tenant_ids:
+            tenant_id = int(raw_id)
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.getdel(self._queries_key(tenant_id))
+                pipe.srem(self._pending_key, tenant_id)
+                count, _ = await pipe.execute()
+            if not count:
+                continue
+            try:
+                async with database.AsyncSessionLocal() as session:
+                    await session.execute(
+                        update(Tenant)
+                        .where(Tenant.id == tenant_id)
+                        .values(trial_queries_used=Tenant.trial_queries_used + int(count))
+                    )
+                    await session.commit()
+            except Exception as e:
+                # Put the count back so the next flush retries it
+                logger.error(f"Failed to flush trial usage for tenant {tenant_id}: {e}")
+                await self.client.incrby(self._queries_key(tenant_id), int(count))
+                await self.client.sadd(self._pending_key, tenant_id)
+
+    async def run(self, interval: float) -> None:
+        """Flush every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Trial usage flush failed: {e}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+trial_usage = TrialUsageCache()
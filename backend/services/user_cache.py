@@ -0,0 +1,54 @@
+from typing import Optional
+import hashlib
+import logging
+
+import redis.asyncio as redis
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserIdCache:
+    """Redis-backed ``email -> user_id`` map so auth can use primary-key lookups.
+
+    Redis errors are logged and treated as cache misses; the database stays the
+    source of truth.
+    """
+
+    def __init__(self, ttl: int = 60, prefix: str = "auth:user_id:"):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._client
+
+    def _key(self, email: str) -> str:
+        return self.prefix + hashlib.sha256(email.lower().encode()).hexdigest()
+
+    async def get(self, email: str) -> Optional[int]:
+        try:
+            value = await self.client.get(self._key(email))
+        except Exception as e:
+            logger.debug(f"User id cache lookup failed: {e}")
+            return None
+        return int(value) if value is not None else None
+
+    async def set(self, email: str, user_id: int) -> None:
+        try:
+            await self.client.set(self._key(email), user_id, ex=self.ttl)
+        except Exception as e:
+            logger.debug(f"User id cache store failed: {e}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+user_id_cache = UserIdCache()
@@ -1,58 +1,370 @@
 from typing import Dict, List, Any, Optional
 from langchain.schema import BaseRetriever, Document
 from langchain.embeddings import OpenAIEmbeddings
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Batch,
+    SearchRequest,
+    VectorParams,
+    Datatype,
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    SearchParams,
+    QuantizationConfig,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    Filter,
+    PayloadSchemaType,
+    PayloadSelectorInclude,
+)
+import asyncio
 import logging
 import uuid
 
+import grpc
+import httpx
+import numpy as np
+import openai
+from cachetools import LRUCache
+from grpc.aio import AioRpcError
+from qdrant_client.http.exceptions import ApiException, ResponseHandlingException, UnexpectedResponse
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
 from core.config import settings
+from services.embedding_cache import embedding_cache
 
 logger = logging.getLogger(__name__)
 
+# Texts per embedding request and how many batches may be in flight at once
+EMBED_BATCH = 96
+EMBED_CONCURRENCY = 4
+
+# Payload fields returned with search hits; the rest stays in Qdrant
+SEARCH_PAYLOAD = PayloadSelectorInclude(include=["text", "source", "page"])
+
+# Indexed payload fields, so filtered searches use filterable HNSW
+PAYLOAD_INDEXES = {
+    "source": PayloadSchemaType.KEYWORD,
+    "page": PayloadSchemaType.INTEGER,
+}
+
+_EMPTY = ""
+
+# Upper bound for query-time hnsw_ef; beyond this latency grows with no recall gain
+MAX_HNSW_EF = 512
+
+
+def chunk_point_id(collection_name: str, text: str, metadata: Dict[str, Any]) -> str:
+    """Deterministic point id for a chunk.
+    
+    Derived from the document id and chunk index when the metadata carries
+    them, otherwise from the chunk text.
+    """
+    if "document_id" in metadata and "chunk_index" in metadata:
+        key = f"{metadata['document_id']}:{metadata['chunk_index']}"
+    else:
+        key = text
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{collection_name}/{key}"))
+
+
+def _normalize(vectors: List[List[float]]) -> np.ndarray:
+    """L2-normalize rows so DOT distance ranks exactly like COSINE.
+    
+    Returns a contiguous float32 array; single searches pass its rows to
+    the client as-is rather than as lists of boxed floats.
+    """
+    arr = np.asarray(vectors, dtype=np.float32)
+    arr /= np.linalg.norm(arr, axis=1, keepdims=True).clip(min=1e-12)
+    return arr
+
+
+def new_embeddings_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP/2 client for OpenAI embedding calls."""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    )
+
+
+def make_embeddings(http_client: httpx.AsyncClient) -> OpenAIEmbeddings:
+    """OpenAI embeddings, truncated to ``EMBEDDING_DIMS`` on text-embedding-3 models.
+    
+    Async calls go through ``http_client``; the OpenAI SDK retries rate
+    limits and 5xx responses with backoff.
+    """
+    model_kwargs = {}
+    if settings.EMBEDDING_MODEL.startswith("text-embedding-3"):
+        # Matryoshka models return a prefix of the full vector when asked
+        model_kwargs["dimensions"] = settings.EMBEDDING_DIMS
+    async_client = openai.AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        max_retries=6,
+        timeout=30.0,
+        http_client=http_client,
+    ).embeddings
+    return OpenAIEmbeddings(
+        openai_api_key=settings.OPENAI_API_KEY,
+        model=settings.EMBEDDING_MODEL,
+        model_kwargs=model_kwargs,
+        max_retries=6,
+        request_timeout=30.0,
+        async_client=async_client
+    )
+
+
+# One process-wide embeddings client, so concurrent requests multiplex
+# over the same HTTP/2 connections instead of each opening its own pool.
+_embeddings_http: Optional[httpx.AsyncClient] = None
+_embeddings: Optional[OpenAIEmbeddings] = None
+
+
+def get_embeddings() -> OpenAIEmbeddings:
+    global _embeddings, _embeddings_http
+    if _embeddings is None:
+        _embeddings_http = new_embeddings_http_client()
+        _embeddings = make_embeddings(_embeddings_http)
+    return _embeddings
+
+
+async def close_embeddings() -> None:
+    """Close the shared embeddings HTTP client."""
+    global _embeddings, _embeddings_http
+    if _embeddings_http is not None:
+        await _embeddings_http.aclose()
+        _embeddings_http = None
+        _embeddings = None
+
+
+def _cache_model(embeddings: OpenAIEmbeddings) -> str:
+    # Same model at a different dimension is a different vector space
+    return f"{embeddings.model}:{embeddings.model_kwargs.get('dimensions', '')}"
+
+
+async def _embed_query(embeddings: OpenAIEmbeddings, query: str) -> np.ndarray:
+    """Embed and normalize a query, serving repeats from the embedding cache."""
+    model = _cache_model(embeddings)
+    vector = await embedding_cache.get(model, query)
+    if vector is None:
+        vector = _normalize([await embeddings.aembed_query(query)])[0]
+        await embedding_cache.set(model, query, vector)
+    return vector
+
+
+async def _embed_queries(embeddings: OpenAIEmbeddings, queries: List[str]) -> List[np.ndarray]:
+    """Embed several queries, sending all cache misses in one request."""
+    model = _cache_model(embeddings)
+    vectors = await asyncio.gather(*[embedding_cache.get(model, q) for q in queries])
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        fresh = _normalize(await embeddings.aembed_documents([queries[i] for i in missing]))
+        for i, vector in zip(missing, fresh):
+            vectors[i] = vector
+            await embedding_cache.set(model, queries[i], vector)
+    return vectors
+
+
+# One process-wide client: gRPC sends vectors as protobuf over a single
+# multiplexed HTTP/2 connection instead of JSON over fresh REST requests.
+_client: Optional[AsyncQdrantClient] = None
+
+
+def get_qdrant_client() -> AsyncQdrantClient:
+    global _client
+    if _client is None:
+        _client = AsyncQdrantClient(
+            url=settings.QDRANT_URL,
+            api_key=settings.QDRANT_API_KEY,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            timeout=30
+        )
+    return _client
+
+
+async def close_qdrant_client() -> None:
+    """Close the shared Qdrant client."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _search_params(top_k: int) -> SearchParams:
+    """Scale query-time ``hnsw_ef`` with the number of results requested."""
+    ef = min(max(settings.QDRANT_HNSW_EF_BASE, 4 * top_k), MAX_HNSW_EF)
+    return SearchParams(
+        hnsw_ef=ef,
+        exact=False,
+        # Traverse with int8 vectors, then rescore 2x top_k candidates in FP32
+        quantization=QuantizationSearchParams(ignore=False, rescore=True, oversampling=2.0)
+    )
+
+
+def _search_requests(
+    vectors: List[np.ndarray],
+    top_k: int,
+    filters: Optional[Filter] = None
+) -> List[SearchRequest]:
+    """One ``search_batch`` request per query vector, sharing search params."""
+    params = _search_params(top_k)
+    return [
+        SearchRequest(
+            # Request models are pydantic and only validate plain lists
+            vector=vector.tolist(),
+            filter=filters,
+            limit=top_k,
+            params=params,
+            with_payload=SEARCH_PAYLOAD,
+            with_vector=False
+        )
+        for vector in vectors
+    ]
+
+
+# Errors a search can hit talking to OpenAI or Qdrant; anything else is a bug
+_SEARCH_ERRORS = (ApiException, grpc.RpcError, httpx.HTTPError, openai.APIError)
+
+_TRANSIENT_GRPC_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Whether retrying the same Qdrant request is likely to succeed.
+    
+    OpenAI errors are never retried here: the SDK client already retries
+    rate limits and connection failures itself (``max_retries``).
+    """
+    if isinstance(exc, ResponseHandlingException):
+        return True
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code in (429, 502, 503, 504)
+    if isinstance(exc, AioRpcError):
+        return exc.code() in _TRANSIENT_GRPC_CODES
+    return False
+
+
+# Transient failures are retried here with jitter and then surfaced, rather
+# than returning no results and making the caller re-run the whole query.
+_retry_transient = retry(
+    retry=retry_if_exception(_is_transient),
+    wait=wait_exponential_jitter(initial=0.1, max=2),
+    stop=stop_after_attempt(4),
+    reraise=True,
+)
+
+
+def _default_quantization() -> Optional[QuantizationConfig]:
+    if not settings.QDRANT_SCALAR_QUANTIZATION:
+        return None
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+    )
+
+
+def _metadata(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # One C-level copy and a pop instead of filtering every key in Python
+    metadata = dict(payload)
+    metadata.pop("text", None)
+    return metadata
+
+
+def _format_hits(search_result) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": hit.id,
+            "score": hit.score,
+            "text": hit.payload.get("text", _EMPTY),
+            "metadata": _metadata(hit.payload)
+        }
+        for hit in search_result
+    ]
+
 
 class QdrantRetriever(BaseRetriever):
     """Qdrant-based document retriever."""
     
-    def __init__(self, collection_name: str, top_k: int = 5):
-        self.client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+    def __init__(
+        self,
+        collection_name: str,
+        top_k: int = 5,
+        client: Optional[AsyncQdrantClient] = None,
+        filters: Optional[Filter] = None,
+        embeddings: Optional[OpenAIEmbeddings] = None
+    ):
+        self.client = client or get_qdrant_client()
         self.collection_name = collection_name
         self.top_k = top_k
-        self.embeddings = OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY)
+        self.filters = filters
+        self.embeddings = embeddings or get_embeddings()
     
+    @_retry_transient
     async def _aget_relevant_documents(self, query: str) -> List[Document]:
         """Retrieve relevant documents for a query."""
         try:
             # Generate query embedding
-            query_embedding = await self.embeddings.aembed_query(query)
+            query_embedding = await _embed_query(self.embeddings, query)
             
             # Search in Qdrant
-            search_result = self.client.search(
+            search_result = await self.client.search(
                 collection_name=self.collection_name,
                 query_vector=query_embedding,
-                limit=self.top_k
+                query_filter=self.filters,
+                limit=self.top_k,
+                search_params=_search_params(self.top_k),
+                with_payload=SEARCH_PAYLOAD,
+                with_vectors=False
             )
             
             # Convert to LangChain documents
-            documents = []
-            for hit in search_result:
-                doc = Document(
-                    page_content=hit.payload.get("text", ""),
-                    metadata={
-                        "score": hit.score,
-                        "chunk_id": hit.id,
-                        "source": hit.payload.get("source", ""),
-                        "page": hit.payload.get("page", 0)
-                    }
-                )
-                documents.append(doc)
-            
-            return documents
+            return self._to_documents(search_result)
             
-        except Exception as e:
+        except _SEARCH_ERRORS as e:
+            if _is_transient(e):
+                raise
             logger.error(f"Error retrieving documents: {e}")
             return []
     
+    @_retry_transient
+    async def aget_relevant_documents_multi(self, queries: List[str]) -> List[List[Document]]:
+        """Retrieve documents for several queries in one Qdrant round-trip."""
+        try:
+            query_embeddings = await _embed_queries(self.embeddings, queries)
+            batch_result = await self.client.search_batch(
+                collection_name=self.collection_name,
+                requests=_search_requests(query_embeddings, self.top_k, self.filters)
+            )
+            return [self._to_documents(search_result) for search_result in batch_result]
+            
+        except _SEARCH_ERRORS as e:
+            if _is_transient(e):
+                raise
+            logger.error(f"Error retrieving documents: {e}")
+            return [[] for _ in queries]
+    
+    @staticmethod
+    def _to_documents(search_result) -> List[Document]:
+        return [
+            Document(
+                page_content=(payload := hit.payload).get("text", _EMPTY),
+                metadata={
+                    "score": hit.score,
+                    "chunk_id": hit.id,
+                    "source": payload.get("source", _EMPTY),
+                    "page": payload.get("page", 0)
+                }
+            )
+            for hit in search_result
+        ]
+    
     def _get_relevant_documents(self, query: str) -> List[Document]:
         """Sync version - not implemented for async-only usage."""
         raise NotImplementedError("Use async version _aget_relevant_documents")
@@ -61,17 +373,55 @@ class QdrantRetriever(BaseRetriever):
 class VectorStoreService:
     """Service for managing vector embeddings and retrieval."""
     
-    def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
-        self.embeddings = OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        client: Optional[AsyncQdrantClient] = None,
+        embeddings: Optional[OpenAIEmbeddings] = None
+    ):
+        self.client = client or get_qdrant_client()
+        self.embeddings = embeddings or get_embeddings()
+        # Unfiltered retrievers by (collection_name, top_k)
+        self._retrievers: LRUCache = LRUCache(maxsize=64)
+        self._warmups: set = set()
     
-    async def create_collection(self, collection_name: str, vector_size: int = 1536):
-        """Create a new Qdrant collection."""
+    async def create_collection(
+        self,
+        collection_name: str,
+        vector_size: Optional[int] = None,
+        hnsw_config: Optional[HnswConfigDiff] = None,
+        optimizers_config: Optional[OptimizersConfigDiff] = None,
+        quantization_config: Optional[QuantizationConfig] = None
+    ):
+        """Create a new Qdrant collection.
+        
+        Vectors default to ``EMBEDDING_DIMS`` wide, stored as float16 when
+        ``QDRANT_FLOAT16_VECTORS`` is set. HNSW parameters default to the
+        ``QDRANT_HNSW_*`` settings; pass
+        ``hnsw_config`` to override per collection (e.g. a smaller ``m`` for
+        short-lived collections).
+        """
         try:
-            self.client.create_collection(
+            await self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+                vectors_config=VectorParams(
+                    size=vector_size or settings.EMBEDDING_DIMS,
+                    distance=Distance.DOT,
+                    datatype=Datatype.FLOAT16 if settings.QDRANT_FLOAT16_VECTORS else None
+                ),
+                hnsw_config=hnsw_config or HnswConfigDiff(
+                    m=settings.QDRANT_HNSW_M,
+                    ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                    full_scan_threshold=settings.QDRANT_FULL_SCAN_THRESHOLD
+                ),
+                optimizers_config=optimizers_config,
+                quantization_config=quantization_config or _default_quantization()
             )
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                await self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
             logger.info(f"Created collection: {collection_name}")
         except Exception as e:
             logger.error(f"Error creating collection {collection_name}: {e}")
@@ -81,88 +431,178 @@ class VectorStoreService:
         self, 
         collection_name: str, 
         texts: List[str], 
-        metadatas: List[Dict[str, Any]]
+        metadatas: List[Dict[str, Any]],
+        wait: bool = True,
+        ids: Optional[List[str]] = None
     ) -> List[str]:
-        """Add documents to a collection."""
+        """Add documents to a collection.
+        
+        Pass stable ``ids`` (see ``chunk_point_id``) when the call may be
+        retried, so a repeat overwrites the same points instead of adding
+        duplicates; otherwise random ids are generated.
+        
+        Texts are embedded and upserted in micro-batches, with up to
+        ``EMBED_CONCURRENCY`` batches in flight so OpenAI and Qdrant I/O
+        overlap and no request exceeds the embedding input limits. Background
+        ingests pass ``wait=False`` to let Qdrant pipeline the writes.
+        """
         try:
-            # Generate embeddings
-            embeddings = await self.embeddings.aembed_documents(texts)
+            point_ids = ids if ids is not None else [str(uuid.uuid4()) for _ in texts]
+            semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
             
-            # Create points for Qdrant
-            points = []
-            point_ids = []
+            async def process_batch(start: int) -> None:
+                end = start + EMBED_BATCH
+                batch_texts = texts[start:end]
+                async with semaphore:
+                    # Generate embeddings
+                    embeddings = _normalize(await self.embeddings.aembed_documents(batch_texts))
+                    
+                    # Column-oriented batch: no per-point model objects to build or serialize
+                    payloads = [
+                        {"text": text, **metadata} if metadata else {"text": text}
+                        for text, metadata in zip(batch_texts, metadatas[start:end])
+                    ]
+                    
+                    # Upload to Qdrant
+                    await self.client.upsert(
+                        collection_name=collection_name,
+                        points=Batch(ids=point_ids[start:end], vectors=embeddings.tolist(), payloads=payloads),
+                        wait=wait
+                    )
             
-            for i, (text, embedding, metadata) in enumerate(zip(texts, embeddings, metadatas)):
-                point_id = str(uuid.uuid4())
-                point_ids.append(point_id)
-                
-                point = PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload={
-                        "text": text,
-                        **metadata
-                    }
-                )
-                points.append(point)
-            
-            # Upload to Qdrant
-            self.client.upsert(
-                collection_name=collection_name,
-                points=points
-            )
+            await asyncio.gather(*[process_batch(start) for start in range(0, len(texts), EMBED_BATCH)])
             
-            logger.info(f"Added {len(points)} documents to {collection_name}")
+            logger.info(f"Added {len(point_ids)} documents to {collection_name}")
             return point_ids
             
         except Exception as e:
             logger.error(f"Error adding documents to {collection_name}: {e}")
             raise
     
+    @_retry_transient
     async def search_documents(
         self, 
         collection_name: str, 
         query: str, 
-        top_k: int = 5
+        top_k: int = 5,
+        filters: Optional[Filter] = None
     ) -> List[Dict[str, Any]]:
-        """Search for similar documents."""
+        """Search for similar documents, optionally filtered on indexed payload fields."""
         try:
             # Generate query embedding
-            query_embedding = await self.embeddings.aembed_query(query)
+            query_embedding = await _embed_query(self.embeddings, query)
             
             # Search in Qdrant
-            search_result = self.client.search(
+            search_result = await self.client.search(
                 collection_name=collection_name,
                 query_vector=query_embedding,
-                limit=top_k
+                query_filter=filters,
+                limit=top_k,
+                search_params=_search_params(top_k),
+                with_payload=SEARCH_PAYLOAD,
+                with_vectors=False
             )
             
             # Format results
-            results = []
-            for hit in search_result:
-                result = {
-                    "id": hit.id,
-                    "score": hit.score,
-                    "text": hit.payload.get("text", ""),
-                    "metadata": {k: v for k, v in hit.payload.items() if k != "text"}
-                }
-                results.append(result)
+            return _format_hits(search_result)
             
-            return results
-            
-        except Exception as e:
+        except _SEARCH_ERRORS as e:
+            if _is_transient(e):
+                raise
             logger.error(f"Error searching documents in {collection_name}: {e}")
             return []
     
+    @_retry_transient
+    async def search_documents_multi(
+        self,
+        collection_name: str,
+        queries: List[str],
+        top_k: int = 5,
+        filters: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with a single ``search_batch`` call."""
+        try:
+            query_embeddings = await _embed_queries(self.embeddings, queries)
+            batch_result = await self.client.search_batch(
+                collection_name=collection_name,
+                requests=_search_requests(query_embeddings, top_k, filters)
+            )
+            return [_format_hits(search_result) for search_result in batch_result]
+            
+        except _SEARCH_ERRORS as e:
+            if _is_transient(e):
+                raise
+            logger.error(f"Error searching documents in {collection_name}: {e}")
+            return [[] for _ in queries]
+    
     async def delete_collection(self, collection_name: str):
         """Delete a collection."""
         try:
-            self.client.delete_collection(collection_name)
+            await self.client.delete_collection(collection_name)
+            for key in [key for key in self._retrievers if key[0] == collection_name]:
+                self._retrievers.pop(key, None)
             logger.info(f"Deleted collection: {collection_name}")
         except Exception as e:
             logger.error(f"Error deleting collection {collection_name}: {e}")
             raise
     
-    def get_retriever(self, collection_name: str, top_k: int = 5) -> QdrantRetriever:
-        """Get a retriever for a specific collection."""
-        return QdrantRetriever(collection_name, top_k)
+    def get_retriever(
+        self,
+        collection_name: str,
+        top_k: int = 5,
+        filters: Optional[Filter] = None
+    ) -> QdrantRetriever:
+        """Get a retriever for a specific collection.
+        
+        Unfiltered retrievers are reused across calls; the first one for a
+        collection also schedules a warmup search.
+        """
+        if filters is not None:
+            return QdrantRetriever(
+                collection_name, top_k, client=self.client, filters=filters, embeddings=self.embeddings
+            )
+        
+        key = (collection_name, top_k)
+        retriever = self._retrievers.get(key)
+        if retriever is None:
+            retriever = QdrantRetriever(collection_name, top_k, client=self.client, embeddings=self.embeddings)
+            self._retrievers[key] = retriever
+            self._schedule_warmup(collection_name)
+        return retriever
+    
+    def _schedule_warmup(self, collection_name: str) -> None:
+        if collection_name in self._warmups:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._warmups.add(collection_name)
+        task = loop.create_task(self.warm_collection(collection_name))
+        task.add_done_callback(lambda _: self._warmups.discard(collection_name))
+    
+    async def warm_collection(self, collection_name: str) -> None:
+        """Run a cheap search so the collection's HNSW entry layer is paged in."""
+        try:
+            info = await self.client.get_collection(collection_name)
+            await self.client.search(
+                collection_name=collection_name,
+                query_vector=np.zeros(info.config.params.vectors.size, dtype=np.float32),
+                limit=1,
+                search_params=SearchParams(hnsw_ef=32),
+                with_payload=False,
+                with_vectors=False
+            )
+        except Exception as e:
+            logger.debug(f"Warmup search on {collection_name} failed: {e}")
+
+
+# Shared instance: the Qdrant client and embeddings hold no per-tenant state
+_vector_store: Optional[VectorStoreService] = None
+
+
+def get_vector_store() -> VectorStoreService:
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = VectorStoreService()
+    return _vector_store
@@ -2,6 +2,13 @@
 
 Run a worker with:
     celery -A tasks.app.celery_app worker -l info
+
+Ingest tasks are network-bound (OpenAI, Qdrant), so give them a thread
+pool with high concurrency rather than the default prefork:
+    celery -A tasks.app.celery_app worker -l info --pool=threads --concurrency=32
+
+gevent (--pool=gevent --concurrency=200) suits purely blocking I/O tasks,
+but not these: each one drives its own asyncio.run event loop.
 """
 from celery import Celery
 import os
@@ -14,14 +21,27 @@ celery_app = Celery(
     "aeonagent",
     broker=BROKER_URL,
     backend=RESULT_BACKEND,
-    include=["tasks.health"],
+    include=["tasks.health", "tasks.usage", "tasks.ingest"],
 )
 
-# Minimal config; can be extended later
 celery_app.conf.update(
-    task_serializer="json",
-    result_serializer="json",
-    accept_content=["json"],
+    # msgpack is smaller and faster than JSON for list-heavy ingest payloads;
+    # JSON is still accepted from older producers
+    task_serializer="msgpack",
+    result_serializer="msgpack",
+    accept_content=["msgpack", "json"],
     timezone="UTC",
     enable_utc=True,
+    broker_pool_limit=50,
+    broker_transport_options={"visibility_timeout": 3600},
+    # One task at a time per worker process so long ingests aren't hoarded
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    beat_schedule={
+        "reconcile-tenant-aggregates": {
+            "task": "usage.reconcile_tenant_aggregates",
+            "schedule": 3600.0,
+        },
+    },
 )
@@ -0,0 +1,54 @@
+"""Document ingest tasks."""
+import asyncio
+from typing import Any, Dict, List
+
+from .app import celery_app
+
+
+async def _upsert(
+    collection_name: str, texts: List[str], metadatas: List[Dict[str, Any]], ids: List[str]
+) -> List[str]:
+    from qdrant_client import AsyncQdrantClient
+
+    from core.config import settings
+    from services.vector_store import VectorStoreService, make_embeddings, new_embeddings_http_client
+
+    # Fresh clients per task: gRPC channels and httpx pools are bound to the
+    # event loop that asyncio.run creates for this invocation.
+    client = AsyncQdrantClient(
+        url=settings.QDRANT_URL,
+        api_key=settings.QDRANT_API_KEY,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        timeout=30,
+    )
+    http_client = new_embeddings_http_client()
+    try:
+        service = VectorStoreService(client=client, embeddings=make_embeddings(http_client))
+        return await service.add_documents(collection_name, texts, metadatas, wait=False, ids=ids)
+    finally:
+        await http_client.aclose()
+        await client.close()
+
+
+@celery_app.task(
+    name="ingest.upsert",
+    acks_late=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def upsert(
+    collection_name: str, texts: List[str], metadatas: List[Dict[str, Any]], ids: List[str]
+) -> List[str]:
+    # Ids come from the producer, so a retry after a partial upsert
+    # overwrites the points already written instead of duplicating them
+    return asyncio.run(_upsert(collection_name, texts, metadatas, ids))
+
+
+def enqueue_upsert(collection_name: str, texts: List[str], metadatas: List[Dict[str, Any]]) -> str:
+    """Queue an ingest from the web process and return the Celery task id."""
+    from services.vector_store import chunk_point_id
+
+    ids = [chunk_point_id(collection_name, text, metadata) for text, metadata in zip(texts, metadatas)]
+    return celery_app.send_task("ingest.upsert", args=[collection_name, texts, metadatas, ids]).id
@@ -0,0 +1,39 @@
+"""Usage aggregate maintenance tasks."""
+import asyncio
+
+from sqlalchemy import text
+
+from .app import celery_app
+
+# Recompute each tenant's rolling 30-day aggregates from interactions; the
+# interaction writer only ever adds, so this drops rows that left the window.
+RECONCILE_TENANT_AGGREGATES = text("""
+    UPDATE tenants AS t
+    SET interactions_count_30d = COALESCE(a.queries, 0),
+        tokens_total_30d = COALESCE(a.tokens, 0)
+    FROM tenants AS t2
+    LEFT JOIN (
+        SELECT tenant_id, count(*) AS queries, sum(tokens_total) AS tokens
+        FROM interactions
+        WHERE timestamp > now() - interval '30 days'
+        GROUP BY tenant_id
+    ) AS a ON a.tenant_id = t2.id
+    WHERE t.id = t2.id
+""")
+
+
+async def _reconcile() -> int:
+    from core.database import build_engine
+
+    engine = build_engine(echo=False)
+    try:
+        async with engine.begin() as conn:
+            result = await conn.execute(RECONCILE_TENANT_AGGREGATES)
+            return result.rowcount
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="usage.reconcile_tenant_aggregates")
+def reconcile_tenant_aggregates() -> int:
+    return asyncio.run(_reconcile())
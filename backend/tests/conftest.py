@@ -0,0 +1,8 @@
+import os
+
+# Required settings, so core.config can be imported without a .env file
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret")
@@ -0,0 +1,9 @@
+from sqlalchemy.orm import configure_mappers
+
+
+def test_models_import_and_configure():
+    import models
+
+    configure_mappers()
+
+    assert models.Tenant.__table__.c.uuid.type.as_uuid